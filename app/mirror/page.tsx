@@ -78,24 +78,36 @@ export default function MirrorPage() {
   React.useEffect(() => {
     if (typeof window === "undefined") return;
     const ws = new WebSocket(buildBackendWsUrl("/ws"));
+    // The backend sends pre-encoded UTF-8 JSON as binary frames
+    ws.binaryType = "arraybuffer";
+    const decoder = new TextDecoder();
+    const handleMessage = (message: BackendMessage) => {
+      if (message.type === "overlay.set") {
+        actions.setOverlays({ ...message, source: "remote" });
+      } else if (message.type === "overlay.clear") {
+        actions.setOverlays(null);
+      } else if (message.type === "status") {
+        actions.setStatus({
+          camera: typeof message.camera === "string" ? message.camera : undefined,
+          lighting: typeof message.lighting === "string" ? message.lighting : undefined,
+          fps: typeof message.fps === "number" ? message.fps : undefined,
+          latency_ms: typeof message.latency_ms === "number" ? message.latency_ms : undefined,
+          reduce_motion: typeof message.reduce_motion === "boolean" ? message.reduce_motion : undefined
+        });
+      } else if (message.type === "tts") {
+        actions.recordTts(message.text);
+        appendVoiceLog({ role: "assistant", text: message.text });
+      }
+    };
     ws.onmessage = (event) => {
       try {
-        const message = JSON.parse(event.data) as BackendMessage;
-        if (message.type === "overlay.set") {
-          actions.setOverlays({ ...message, source: "remote" });
-        } else if (message.type === "overlay.clear") {
-          actions.setOverlays(null);
-        } else if (message.type === "status") {
-          actions.setStatus({
-            camera: typeof message.camera === "string" ? message.camera : undefined,
-            lighting: typeof message.lighting === "string" ? message.lighting : undefined,
-            fps: typeof message.fps === "number" ? message.fps : undefined,
-            latency_ms: typeof message.latency_ms === "number" ? message.latency_ms : undefined,
-            reduce_motion: typeof message.reduce_motion === "boolean" ? message.reduce_motion : undefined
-          });
-        } else if (message.type === "tts") {
-          actions.recordTts(message.text);
-          appendVoiceLog({ role: "assistant", text: message.text });
+        const raw = typeof event.data === "string" ? event.data : decoder.decode(event.data);
+        const parsed = JSON.parse(raw) as BackendMessage | { type: "batch"; msgs: BackendMessage[] };
+        // The backend coalesces queued messages into {"type": "batch", "msgs": [...]}
+        if (parsed.type === "batch" && "msgs" in parsed) {
+          parsed.msgs.forEach(handleMessage);
+        } else {
+          handleMessage(parsed as BackendMessage);
         }
       } catch (error) {
         console.warn("Bad WS payload", error);
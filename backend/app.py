@@ -1,25 +1,31 @@
 import asyncio
 import base64
 import contextlib
+import hashlib
 import importlib.util
-import json
 import logging
 import os
 import platform
+import shutil
 import subprocess
 import tempfile
-from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
 from functools import lru_cache
-from threading import Lock
-from typing import Any, Dict, List, Optional
+from queue import SimpleQueue
+from threading import Lock, Thread, get_ident
+from typing import Annotated, Any, Deque, Dict, List, Optional, Set, Tuple, Union
 
-from fastapi import FastAPI, File, HTTPException, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response
-from pydantic import BaseModel, Field, validator
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, Field, StringConstraints
 
 import cv2
+import orjson
 from pathlib import Path
 
 # Import task system
@@ -40,37 +46,64 @@ logging.basicConfig(
 
 # --- OpenCV perf knobs (early, process-wide) ---
 try:
-    cv2.useOptimized()
+    # useOptimized() is only a getter; this actually enables the SIMD code paths
+    cv2.setUseOptimized(True)
 except Exception as exc:
     logging.debug("OpenCV optimizations unavailable: %s", exc)
+# setNumThreads is process-wide (not per thread): keep OpenCV's own pool off so
+# the capture and pipeline threads don't oversubscribe cores with it
 try:
     cv2.setNumThreads(1)
 except Exception as exc:
     logging.debug("OpenCV setNumThreads unavailable: %s", exc)
 # -----------------------------------------------
 
+# --- Event loop (uvloop ships with uvicorn[standard] on POSIX) ---
+try:
+    import uvloop  # type: ignore[import]
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    _HAS_UVLOOP = True
+except ImportError:  # pragma: no cover - optional dependency
+    _HAS_UVLOOP = False
+    logging.debug("uvloop unavailable; using default asyncio event loop")
+# -----------------------------------------------
+
+# --- Optional msgpack WS codec (clients opt in with ?codec=msgpack) ---
+try:
+    import msgpack  # type: ignore[import]
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+    logging.debug("msgpack unavailable; WebSocket clients always receive JSON")
+# -----------------------------------------------
+
 # --- WS origin policy (dev-friendly) ---
 # Default "*" allows all origins for development. 
 # For production, set ALLOW_WS_ORIGINS env var to comma-separated list of allowed domains.
 # Example: ALLOW_WS_ORIGINS="https://yourdomain.com,https://mirror.local"
-_WS_ALLOWED = os.getenv("ALLOW_WS_ORIGINS", "*").split(",")
+_WS_ALLOWED = tuple(o.strip() for o in os.getenv("ALLOW_WS_ORIGINS", "*").split(",") if o.strip())
+_WS_ALLOW_ANY = "*" in _WS_ALLOWED
+# Exact origins (scheme://host[:port]) hit this set; prefix matching remains the fallback
+_WS_ALLOWED_EXACT = frozenset(_WS_ALLOWED)
+# Always allow localhost patterns for dev convenience
+_WS_LOCAL_PREFIXES = (
+    "http://localhost", "https://localhost",
+    "http://127.0.0.1", "https://127.0.0.1",
+)
 
+@lru_cache(maxsize=256)
 def _ws_origin_ok(origin: Optional[str]) -> bool:
+    if _WS_ALLOW_ANY:
+        return True
     # Browsers may omit Origin for file://; allow in dev.
     if not origin or origin == "null" or origin.startswith("file://"):
         return True
-    if "*" in _WS_ALLOWED:
+    if origin in _WS_ALLOWED_EXACT:
         return True
-    # Always allow localhost patterns for dev convenience
-    if any(origin.startswith(p) for p in (
-        "http://localhost", "https://localhost",
-        "http://127.0.0.1", "https://127.0.0.1"
-    )):
-        return True
-    return any(origin.startswith(p) for p in _WS_ALLOWED)
+    return origin.startswith(_WS_LOCAL_PREFIXES) or origin.startswith(_WS_ALLOWED)
 # ---------------------------------------
 
-app = FastAPI(title="Assistive Coach Backend", version="0.1.0")
+app = FastAPI(title="Assistive Coach Backend", version="0.1.0", default_response_class=ORJSONResponse)
 
 ALLOWED_ORIGINS = [
     "http://localhost",
@@ -90,61 +123,67 @@ app.add_middleware(
 )
 
 
-class Anchor(BaseModel):
+_SHAPE_KINDS = frozenset({"ring", "arrow", "badge"})
+_SHAPE_KINDS_SORTED = sorted(_SHAPE_KINDS)
+_MESSAGE_TYPES = frozenset({"overlay.set", "status", "tts", "safety.alert"})
+# /overlay additionally accepts overlay.clear, which carries no typed payload
+_OVERLAY_MESSAGE_TYPES = _MESSAGE_TYPES | {"overlay.clear"}
+
+
+@dataclass(slots=True)
+class Anchor:
     landmark: Optional[str] = None
-    aruco_id: Optional[int] = Field(default=None, ge=0)
+    aruco_id: Optional[int] = None
     pixel: Optional[Dict[str, float]] = None
 
-    @validator("pixel")
-    def validate_pixel(cls, value: Optional[Dict[str, float]]) -> Optional[Dict[str, float]]:
-        if value is None:
-            return value
-        if not {"x", "y"}.issubset(value.keys()):
+    def __post_init__(self) -> None:
+        if self.aruco_id is not None and self.aruco_id < 0:
+            raise ValueError("aruco_id must be >= 0")
+        if self.pixel is not None and not {"x", "y"}.issubset(self.pixel.keys()):
             raise ValueError("pixel anchor must include x and y")
-        return value
-
-    @validator("landmark")
-    def validate_landmark(cls, value: Optional[str], values: Dict[str, object]) -> Optional[str]:
-        if value and values.get("aruco_id") is not None:
+        if self.landmark and self.aruco_id is not None:
             raise ValueError("Anchor cannot define both landmark and aruco_id")
-        return value
 
 
-class Shape(BaseModel):
+@dataclass(slots=True)
+class Shape:
     kind: str
     anchor: Anchor
     to: Optional[Anchor] = None
-    radius_px: Optional[int] = Field(default=None, ge=0)
+    radius_px: Optional[int] = None
     accent: Optional[str] = None
     text: Optional[str] = None
 
-    @validator("kind")
-    def validate_kind(cls, value: str) -> str:
-        allowed = {"ring", "arrow", "badge"}
-        if value not in allowed:
-            raise ValueError(f"Shape kind must be one of {sorted(allowed)}")
-        return value
-
-    @validator("to")
-    def validate_to(cls, value: Optional[Anchor], values: Dict[str, object]) -> Optional[Anchor]:
-        if values.get("kind") == "arrow" and value is None:
+    def __post_init__(self) -> None:
+        if self.kind not in _SHAPE_KINDS:
+            raise ValueError(f"Shape kind must be one of {_SHAPE_KINDS_SORTED}")
+        if self.kind == "arrow" and self.to is None:
             raise ValueError("Arrow shapes require a 'to' anchor")
-        return value
+        if self.radius_px is not None and self.radius_px < 0:
+            raise ValueError("radius_px must be >= 0")
 
 
-class HUDPayload(BaseModel):
+@dataclass(slots=True)
+class HUDPayload:
     title: Optional[str] = None
     step: Optional[str] = None
     subtitle: Optional[str] = None
-    time_left_s: Optional[int] = Field(default=None, ge=0)
+    time_left_s: Optional[int] = None
     hint: Optional[str] = None
     instruction: Optional[str] = None
-    max_time_s: Optional[int] = Field(default=None, ge=0)
+    max_time_s: Optional[int] = None
     progress: Optional[float] = None
     coach_tip: Optional[str] = None
 
+    def __post_init__(self) -> None:
+        if self.time_left_s is not None and self.time_left_s < 0:
+            raise ValueError("time_left_s must be >= 0")
+        if self.max_time_s is not None and self.max_time_s < 0:
+            raise ValueError("max_time_s must be >= 0")
+
 
-class OverlayMessage(BaseModel):
+@dataclass(slots=True)
+class OverlayMessage:
     type: str
     hud: Optional[HUDPayload] = None
     camera: Optional[str] = None
@@ -156,38 +195,32 @@ class OverlayMessage(BaseModel):
     level: Optional[str] = None
     reason: Optional[str] = None
 
-    @validator("type")
-    def validate_type(cls, value: str) -> str:
-        allowed = {"overlay.set", "status", "tts", "safety.alert"}
-        if value not in allowed:
-            raise ValueError(f"Unsupported message type: {value}")
-        return value
+    def __post_init__(self) -> None:
+        if self.type not in _MESSAGE_TYPES:
+            raise ValueError(f"Unsupported message type: {self.type}")
 
 
-class OverlayRequest(BaseModel):
+@dataclass(slots=True)
+class OverlayRequest:
     message: OverlayMessage
 
 
 class TTSRequest(BaseModel):
-    text: str
-
-    @validator("text")
-    def validate_text(cls, value: str) -> str:
-        trimmed = value.strip()
-        if not trimmed:
-            raise ValueError("Text cannot be empty")
-        return trimmed
+    # Stripped and checked for emptiness by pydantic-core rather than a Python validator
+    text: Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
 
 
 class VoiceResponse(BaseModel):
-    transcript: Optional[str]
-    response_text: Optional[str]
+    transcript: Optional[str] = None
+    response_text: Optional[str] = None
     audio_b64: Optional[str] = None
+    # Container of audio_b64: "mp3" by default, "wav" when TTS is configured for LINEAR16
+    audio_format: Optional[str] = None
 
 
 class SessionRequest(BaseModel):
-    patient_id: Optional[str]
-    routine_id: Optional[str]
+    patient_id: Optional[str] = None
+    routine_id: Optional[str] = None
 
 
 class SettingsPayload(BaseModel):
@@ -200,7 +233,8 @@ class SettingsPayload(BaseModel):
     cloud_min_interval_ms: Optional[int] = Field(default=None, ge=0)
 
 
-class HealthState(BaseModel):
+@dataclass(slots=True)
+class HealthState:
     camera: str = "off"
     lighting: str = "unknown"
     fps: float = 0.0
@@ -226,7 +260,8 @@ class HealthResponse(BaseModel):
     cloud: Optional[Dict[str, Any]] = None
 
 
-class SettingsState(BaseModel):
+@dataclass(slots=True)
+class SettingsState:
     use_cloud: bool = False
     face: bool = True
     hands: bool = True
@@ -239,203 +274,471 @@ class SettingsState(BaseModel):
     reduce_motion: bool = False
 
 
-class SessionState(BaseModel):
+@dataclass(slots=True)
+class SessionState:
     patient_id: Optional[str] = None
     routine_id: Optional[str] = None
-    started_at: Optional[datetime] = None
+    started_at: Optional[str] = None  # ISO-8601 UTC, formatted once when the session starts
     step_index: int = 0
+    task_session: Optional[TaskSession] = None  # Current active task
+
+    def to_payload(self) -> Dict[str, Any]:
+        # Public session fields only; the live TaskSession is not serialisable state
+        return {
+            "patient_id": self.patient_id,
+            "routine_id": self.routine_id,
+            "started_at": self.started_at,
+            "step_index": self.step_index,
+        }
+
+
+_CLIENT_QUEUE_MAX = 8
 
 
 class ConnectionManager:
     def __init__(self) -> None:
-        self._active_connections: List[WebSocket] = []
-        self._lock = asyncio.Lock()
+        # Copy-on-write snapshot of (websocket, send queue, wants msgpack) entries. It is only
+        # rebuilt on connect/disconnect, so broadcast can iterate it without taking a lock.
+        self._active_connections: Tuple[Tuple[WebSocket, "asyncio.Queue[bytes]", bool], ...] = ()
+        self._writers: Dict[WebSocket, asyncio.Task] = {}
 
-    async def connect(self, websocket: WebSocket) -> None:
+    async def connect(self, websocket: WebSocket, use_msgpack: bool = False) -> None:
         await websocket.accept()
-        async with self._lock:
-            self._active_connections.append(websocket)
+        queue: "asyncio.Queue[bytes]" = asyncio.Queue(maxsize=_CLIENT_QUEUE_MAX)
+        self._writers[websocket] = asyncio.create_task(self._writer(websocket, queue))
+        self._active_connections = self._active_connections + ((websocket, queue, use_msgpack),)
         LOGGER.info("WebSocket client connected. active=%d", len(self._active_connections))
 
     async def disconnect(self, websocket: WebSocket) -> None:
-        async with self._lock:
-            if websocket in self._active_connections:
-                self._active_connections.remove(websocket)
+        # Both the writer and the receive loop may report the same dead socket; only the
+        # first call rebuilds the snapshot
+        writer = self._writers.pop(websocket, None)
+        if writer is None:
+            return
+        self._active_connections = tuple(
+            entry for entry in self._active_connections if entry[0] is not websocket
+        )
+        if writer is not asyncio.current_task():
+            writer.cancel()
         LOGGER.info("WebSocket client disconnected. active=%d", len(self._active_connections))
 
-    async def broadcast(self, message: Dict[str, object]) -> None:
-        payload = json.dumps(message)
-        async with self._lock:
-            websockets = list(self._active_connections)
-        for connection in websockets:
+    @property
+    def has_connections(self) -> bool:
+        return bool(self._active_connections)
+
+    def broadcast(self, message: Union[Dict[str, object], bytes]) -> None:
+        connections = self._active_connections  # atomic snapshot
+        if not connections:
+            return
+        # Encode once per codec; every client of a codec gets the same bytes object
+        payload = message if isinstance(message, bytes) else orjson.dumps(message)
+        packed: Optional[bytes] = None
+        for _, queue, use_msgpack in connections:
+            data = payload
+            if use_msgpack:
+                # Packed at most once per broadcast, and only if such a client is connected
+                if packed is None:
+                    packed = msgpack.packb(orjson.loads(payload), use_single_float=True)
+                data = packed
+            if queue.full():
+                # Slow consumer: shed its oldest frame so it catches up on the latest state
+                # instead of stalling producers or growing its backlog
+                queue.get_nowait()
+                queue.task_done()  # the dropped frame will never reach the writer
+                LOGGER.debug("WebSocket client send queue full; dropped oldest frame")
+            queue.put_nowait(data)
+
+    async def _writer(self, websocket: WebSocket, queue: "asyncio.Queue[bytes]") -> None:
+        while True:
+            payload = await queue.get()
             try:
-                await connection.send_text(payload)
+                await websocket.send_bytes(payload)
             except Exception as exc:  # pragma: no cover - defensive log
                 LOGGER.warning("Failed to send WS message: %s", exc)
+                await self.disconnect(websocket)
+                return
+            finally:
+                queue.task_done()
+
+    async def close_all(self, drain_timeout: float = 0.0) -> None:
+        """Close every client concurrently so one slow close handshake cannot delay the rest.
+
+        With a drain_timeout, frames already queued per client get that long to go out first.
+        """
+        entries = self._active_connections
+        if drain_timeout > 0 and entries:
+            drains = [asyncio.ensure_future(entry[1].join()) for entry in entries]
+            _, stalled = await asyncio.wait(drains, timeout=drain_timeout)
+            for drain in stalled:
+                drain.cancel()
+        connections = [entry[0] for entry in entries]
+        self._active_connections = ()
+        writers = list(self._writers.values())
+        self._writers.clear()
+        for writer in writers:
+            writer.cancel()
+        await asyncio.gather(
+            *(connection.close(code=1001) for connection in connections),
+            *writers,
+            return_exceptions=True,
+        )
 
 
 settings_state = SettingsState()
 health_state = HealthState()
 session_state = SessionState()
-active_task_session: Optional[TaskSession] = None  # Current active task
 manager = ConnectionManager()
-_executor = ThreadPoolExecutor(max_workers=4)
-_preview_buffer: Optional[bytes] = None
-_preview_lock = Lock()
-_message_queue: Optional["asyncio.Queue[Dict[str, object]]"] = None
+_tts_queue: Optional["asyncio.Queue[str]"] = None
+_tts_task: Optional[asyncio.Task] = None
+_TTS_QUEUE_MAX = 16
+_TTS_DEDUPE_WINDOW_S = 0.5
+_tts_inflight: Set[str] = set()
+_tts_last: Tuple[str, float] = ("", 0.0)  # (text, monotonic time it finished)
+_preview: Optional[Tuple[bytes, str]] = None  # (jpeg bytes, quoted ETag)
+# Pending broadcasts: a plain deque plus a wake-up event, appended to only on the loop thread
+_pending: Deque[Union[Dict[str, object], bytes]] = deque()
+_pending_event: Optional[asyncio.Event] = None
+_stopping = False  # set on shutdown; the worker exits once it has flushed _pending
+_SHUTDOWN_DRAIN_S = 1.0
 _broadcast_task: Optional[asyncio.Task] = None
 _event_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_tid: Optional[int] = None  # thread ident of _event_loop, set on startup
 _voice_assistant: Optional[VoiceAssistant] = None
+_MESSAGE_QUEUE_MAX = 64
+_BATCH_MAX_MESSAGES = 32
+_UPLOAD_CHUNK_BYTES = 1 << 16
+
+
+def _is_overlay_set(message: Union[Dict[str, object], bytes]) -> bool:
+    # Pre-encoded /overlay bodies are passed through untouched rather than decoded here
+    return isinstance(message, dict) and message.get("type") == "overlay.set"
+
+
+def _coalesce_overlays(
+    batch: List[Union[Dict[str, object], bytes]],
+) -> List[Union[Dict[str, object], bytes]]:
+    """Keep only the newest overlay.set in a batch; everything else is kept in order."""
+    last = -1
+    for index, message in enumerate(batch):
+        if _is_overlay_set(message):
+            last = index
+    if last < 0:
+        return batch
+    return [m for index, m in enumerate(batch) if index == last or not _is_overlay_set(m)]
 
 
 async def _broadcast_worker() -> None:
-    global _message_queue
-    if _message_queue is None:
+    if _pending_event is None:
         LOGGER.warning("Broadcast queue not initialised; worker exiting")
         return
     LOGGER.info("Broadcast worker started")
     while True:
-        message = await _message_queue.get()
+        await _pending_event.wait()
+        _pending_event.clear()
+        stopping = _stopping
+        # Drain whatever is pending so a backlog goes out in as few frames as possible
+        while _pending:
+            batch = [_pending.popleft() for _ in range(min(len(_pending), _BATCH_MAX_MESSAGES))]
+            # Overlay frames are latest-wins; only the newest one in a backlog is worth sending
+            outgoing = _coalesce_overlays(batch) if len(batch) > 1 else batch
+            if len(outgoing) == 1:
+                manager.broadcast(outgoing[0])
+            else:
+                msgs = [orjson.Fragment(m) if isinstance(m, bytes) else m for m in outgoing]
+                manager.broadcast({"type": "batch", "msgs": msgs})
+        if stopping:
+            LOGGER.info("Broadcast worker drained; exiting")
+            return
+
+
+def _message_type(message: Union[Dict[str, object], bytes]) -> Optional[object]:
+    if isinstance(message, bytes):
+        # Only reached on the overflow path, so decoding here stays off the hot path
         try:
-            await manager.broadcast(message)
-        finally:
-            _message_queue.task_done()
+            decoded = orjson.loads(message)
+        except orjson.JSONDecodeError:
+            return None
+        return decoded.get("type") if isinstance(decoded, dict) else None
+    return message.get("type")
+
+
+def _evict_stale_overlay() -> bool:
+    """Drop the oldest pending overlay.set; newer frames supersede it anyway."""
+    for index, item in enumerate(_pending):
+        if _message_type(item) == "overlay.set":
+            del _pending[index]
+            return True
+    return False
 
 
-def queue_broadcast(message: Dict[str, object]) -> None:
-    global _message_queue, _event_loop
-    if _message_queue is None:
+def _enqueue_message(message: Union[Dict[str, object], bytes]) -> None:
+    # Must run on the event loop thread, which is the only thread touching _pending
+    if _pending_event is None:
+        return
+    if len(_pending) >= _MESSAGE_QUEUE_MAX and not _evict_stale_overlay():
+        # Nothing stale to shed (only tts/status/safety messages pending)
+        LOGGER.warning("Broadcast queue full; dropping message")
+        return
+    _pending.append(message)
+    _pending_event.set()
+
+
+def queue_broadcast(message: Union[Dict[str, object], bytes]) -> None:
+    """Enqueue a message dict, or an already JSON-encoded message, for broadcast."""
+    if _pending_event is None:
         LOGGER.warning("Broadcast queue not ready; dropping message")
         return
-    try:
-        running_loop = asyncio.get_running_loop()
-    except RuntimeError:
-        running_loop = None
+    if not manager.has_connections:
+        # Nobody listening (warmup/headless): skip the enqueue and the encode entirely
+        return
 
-    if running_loop and running_loop is _event_loop:
-        try:
-            _message_queue.put_nowait(message)
-        except asyncio.QueueFull:  # pragma: no cover - defensive log
-            LOGGER.warning("Broadcast queue full; dropping message")
+    if get_ident() == _loop_tid:
+        _enqueue_message(message)
         return
 
     if _event_loop is None:
         LOGGER.warning("Broadcast loop not ready; dropping message")
         return
 
-    def _enqueue() -> None:
-        if _message_queue is None:
-            return
-        if _message_queue.full():  # pragma: no cover - overflow guard
-            LOGGER.warning("Broadcast queue full; dropping message")
-            return
-        _message_queue.put_nowait(message)
-
-    _event_loop.call_soon_threadsafe(_enqueue)
-
-
-async def broadcast(message: Dict[str, object]) -> None:
-    queue_broadcast(message)
+    _event_loop.call_soon_threadsafe(_enqueue_message, message)
 
 
 def set_preview_frame(jpeg_bytes: bytes) -> None:
-    global _preview_buffer
-    with _preview_lock:
-        _preview_buffer = jpeg_bytes
-
-
-async def get_preview_frame() -> Optional[bytes]:
-    global _preview_buffer
-    with _preview_lock:
-        return _preview_buffer
+    # Rebinding a module global is atomic under the GIL, so readers always see a
+    # complete frame and its matching ETag without a lock on the vision thread's path.
+    global _preview
+    etag = hashlib.blake2b(jpeg_bytes, digest_size=8).hexdigest()
+    _preview = (jpeg_bytes, f'"{etag}"')
 
 
-@lru_cache
-def _detect_speech_engine() -> str:
-    if shutil and shutil.which("espeak-ng"):
-        return "espeak-ng"
-    if importlib.util.find_spec("pyttsx3") is not None:
-        return "pyttsx3"
-    return ""
+def get_preview_frame() -> Optional[bytes]:
+    preview = _preview
+    return preview[0] if preview else None
 
 
-try:
-    import shutil
-except ImportError:  # pragma: no cover
-    shutil = None  # type: ignore
+_TASKS_PATH = Path(__file__).resolve().parents[1] / "config" / "tasks.json"
 
 
-_speech_engine = _detect_speech_engine()
+_tasks_cache: Dict[str, Any] = {}
+_tasks_mtime_ns: Optional[int] = None
 
 
-def _speak_espeak(text: str) -> None:
+def _load_tasks_config() -> Dict[str, Any]:
+    """Return parsed config/tasks.json, re-reading it only when the file changes."""
+    global _tasks_cache, _tasks_mtime_ns
     try:
-        subprocess.run(
-            [_speech_engine, text],
-            check=True,
+        mtime_ns = _TASKS_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        _tasks_cache, _tasks_mtime_ns = {}, None
+        return _tasks_cache
+    if mtime_ns != _tasks_mtime_ns:
+        _tasks_cache = orjson.loads(_TASKS_PATH.read_bytes())
+        _tasks_mtime_ns = mtime_ns
+        _first_step_huds.clear()
+    return _tasks_cache
+
+
+_first_step_huds: Dict[str, Optional[bytes]] = {}
+
+
+def _first_step_hud(routine_id: str) -> Optional[bytes]:
+    """Encoded Step 1 overlay.set for a routine, built once per tasks.json revision."""
+    tasks = _load_tasks_config()
+    if routine_id not in tasks:
+        # Client-supplied id: only real routines get a cache slot, so the cache stays bounded
+        return None
+    routine_steps = tasks[routine_id] or []
+    if routine_id not in _first_step_huds:
+        hud = None
+        if routine_steps:
+            step = routine_steps[0]
+            hud = orjson.dumps({
+                "type": "overlay.set",
+                "shapes": [],  # Vision pipeline will add shapes
+                "hud": {
+                    "title": step.get("title"),
+                    "step": f"Step 1 of {len(routine_steps)}",
+                    "subtitle": step.get("subtitle"),
+                    "time_left_s": step.get("min_time_s"),
+                    "max_time_s": step.get("min_time_s"),
+                    "hint": step.get("hint"),
+                },
+            })
+        _first_step_huds[routine_id] = hud
+    return _first_step_huds[routine_id]
+
+
+# Resolved once at import; installed TTS tooling does not change while the server runs
+_IS_MACOS = platform.system() == "Darwin"
+_HAS_ESPEAK = shutil.which("espeak-ng") is not None
+_HAS_PYTTSX = importlib.util.find_spec("pyttsx3") is not None
+_SPEECH_ENGINE = "espeak-ng" if _HAS_ESPEAK else ("pyttsx3" if _HAS_PYTTSX else "")
+
+
+_espeak_proc: Optional["subprocess.Popen[bytes]"] = None
+_espeak_lock = Lock()
+_ESPEAK_CLOSE_TIMEOUT_S = 2.0
+
+
+def _get_espeak_proc() -> "subprocess.Popen[bytes]":
+    """Return the long-lived `espeak-ng` process, respawning it if it exited."""
+    global _espeak_proc
+    if _espeak_proc is None or _espeak_proc.poll() is not None:
+        # No text/file argument: espeak-ng then speaks stdin as each line arrives,
+        # whereas `--stdin` buffers everything until EOF
+        _espeak_proc = subprocess.Popen(
+            ["espeak-ng"],
+            stdin=subprocess.PIPE,
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
         )
-    except subprocess.CalledProcessError as exc:
-        LOGGER.error("espeak-ng failed: %s", exc)
-        raise
+    return _espeak_proc
+
 
+def _speak_espeak_pipe(text: str) -> bool:
+    """Write one utterance to the persistent espeak-ng pipe; False if the pipe is unusable."""
+    global _espeak_proc
+    # Interactive espeak-ng speaks per line, so keep each utterance on a single line
+    line = " ".join(text.split()).encode("utf-8") + b"\n"
+    with _espeak_lock:
+        try:
+            proc = _get_espeak_proc()
+            proc.stdin.write(line)  # type: ignore[union-attr]
+            proc.stdin.flush()  # type: ignore[union-attr]
+            return True
+        except (OSError, ValueError) as exc:
+            LOGGER.warning("espeak-ng pipe failed; falling back to per-call spawn: %s", exc)
+            _espeak_proc = None
+            return False
 
-def _speak_pyttsx(text: str) -> None:
+
+def _close_espeak_pipe() -> None:
+    global _espeak_proc
+    with _espeak_lock:
+        proc, _espeak_proc = _espeak_proc, None
+    if proc is None:
+        return
+    with contextlib.suppress(Exception):
+        if proc.stdin is not None:
+            proc.stdin.close()
+    try:
+        # EOF lets espeak-ng finish whatever is still buffered before it exits
+        proc.wait(timeout=_ESPEAK_CLOSE_TIMEOUT_S)
+    except subprocess.TimeoutExpired:
+        with contextlib.suppress(Exception):
+            proc.terminate()
+
+
+# pyttsx3 engine lives on one dedicated thread: init loads the platform driver once, and
+# some drivers (SAPI/COM, NSSpeechSynthesizer) must be driven from the thread that made them
+_pyttsx_queue: "SimpleQueue[Optional[Tuple[str, Future]]]" = SimpleQueue()
+_pyttsx_thread: Optional[Thread] = None
+
+
+def _pyttsx_loop() -> None:
     try:
         import pyttsx3  # type: ignore[import]
-    except ImportError as exc:  # pragma: no cover - optional dependency
+
+        engine = pyttsx3.init()
+    except Exception as exc:  # pragma: no cover - optional dependency
         LOGGER.error("pyttsx3 unavailable: %s", exc)
-        return
+        engine = None
+    while True:
+        item = _pyttsx_queue.get()
+        if item is None:
+            return
+        text, done = item
+        if engine is None:
+            done.set_result(None)
+            continue
+        try:
+            engine.say(text)
+            engine.runAndWait()
+        except Exception as exc:  # pragma: no cover - driver errors
+            done.set_exception(exc)
+        else:
+            done.set_result(None)
 
-    engine = pyttsx3.init()
-    engine.say(text)
-    engine.runAndWait()
 
+def _start_pyttsx_thread() -> None:
+    global _pyttsx_thread
+    if _pyttsx_thread is None:
+        _pyttsx_thread = Thread(target=_pyttsx_loop, name="pyttsx3", daemon=True)
+        _pyttsx_thread.start()
 
-def _speak_system(text: str) -> bool:
-    """Platform-aware TTS; returns True if spoken, False otherwise."""
+
+async def _speak_pyttsx(text: str) -> None:
+    _start_pyttsx_thread()
+    done: Future = Future()
+    _pyttsx_queue.put((text, done))
+    await asyncio.wrap_future(done)
+
+
+async def _run_tts_command(*argv: str) -> bool:
     try:
-        import shutil as _sh
-    except ImportError:
-        _sh = None  # type: ignore
-    sysname = platform.system()
-    if sysname == "Darwin":
-        try:
-            subprocess.run(["say", text], check=True)
-            return True
-        except Exception as exc:  # pragma: no cover
-            LOGGER.warning("macOS say failed: %s", exc)
-            return False
-    if sysname == "Linux" and _sh and _sh.which("espeak-ng"):
-        try:
-            subprocess.run(["espeak-ng", text], check=True)
-            return True
-        except Exception as exc:  # pragma: no cover
-            LOGGER.warning("espeak-ng failed: %s", exc)
-            return False
-    return False
+        proc = await asyncio.create_subprocess_exec(
+            *argv, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+        )
+    except OSError as exc:  # pragma: no cover
+        LOGGER.warning("%s failed to start: %s", argv[0], exc)
+        return False
+    if await proc.wait() != 0:  # pragma: no cover
+        LOGGER.warning("%s exited with status %d", argv[0], proc.returncode)
+        return False
+    return True
 
 
-def speak_text(text: str) -> None:
+async def speak_text(text: str) -> None:
+    """Speak text without blocking the event loop or a pool thread."""
     # Try system first
-    if _speak_system(text):
-        return
+    if _IS_MACOS:
+        if await _run_tts_command("say", text):
+            return
+    elif _SPEECH_ENGINE == "espeak-ng":
+        # Pipe writes can block on a full pipe and take the lock; keep them off the loop
+        if await asyncio.to_thread(_speak_espeak_pipe, text) or await _run_tts_command(
+            "espeak-ng", text
+        ):
+            return
     # Fallback chain
-    if _speech_engine == "pyttsx3":
+    if _SPEECH_ENGINE == "pyttsx3":
         try:
-            _speak_pyttsx(text)
+            await _speak_pyttsx(text)
         except Exception as exc:  # pragma: no cover
             LOGGER.warning("pyttsx3 fallback failed: %s", exc)
-    elif _speech_engine:
-        try:
-            _speak_espeak(text)
-        except Exception as exc:  # pragma: no cover
-            LOGGER.warning("espeak-ng fallback failed: %s", exc)
-    else:
+    elif not _SPEECH_ENGINE:
         LOGGER.warning("No TTS engine available; skipping")
 
 
+def queue_tts(text: str) -> bool:
+    """Hand text to the TTS worker; returns False if it was dropped."""
+    if _tts_queue is None:
+        LOGGER.warning("TTS queue not ready; dropping text")
+        return False
+    try:
+        _tts_queue.put_nowait(text)
+    except asyncio.QueueFull:
+        LOGGER.warning("TTS queue full; dropping text")
+        return False
+    return True
+
+
+async def _tts_worker() -> None:
+    global _tts_last
+    if _tts_queue is None:
+        return
+    while True:
+        text = await _tts_queue.get()
+        try:
+            await speak_text(text)
+        except Exception as exc:  # pragma: no cover - defensive log
+            LOGGER.warning("TTS failed: %s", exc)
+        finally:
+            _tts_inflight.discard(text)
+            _tts_last = (text, time.monotonic())
+            _tts_queue.task_done()
+
+
 @app.on_event("startup")
 async def _init_voice_assistant() -> None:
     global _voice_assistant
@@ -444,10 +747,23 @@ async def _init_voice_assistant() -> None:
     except Exception as exc:  # pragma: no cover - defensive log
         LOGGER.warning("Failed to initialise VoiceAssistant: %s", exc)
         _voice_assistant = None
+    if _SPEECH_ENGINE == "pyttsx3":
+        _start_pyttsx_thread()
+    elif _SPEECH_ENGINE == "espeak-ng":
+        try:
+            with _espeak_lock:
+                _get_espeak_proc()
+        except OSError as exc:  # pragma: no cover - defensive log
+            LOGGER.warning("Failed to start espeak-ng pipe: %s", exc)
+    # Parse tasks.json now so the first /session/start is served from cache
+    try:
+        _load_tasks_config()
+    except Exception as exc:  # pragma: no cover - defensive log
+        LOGGER.warning("Failed to preload tasks config: %s", exc)
 
 
 @app.get("/health", response_model=HealthResponse)
-async def get_health() -> HealthResponse:
+async def get_health() -> ORJSONResponse:
     vision_state = None
     if _vision_pipeline:
         vision_state = {
@@ -466,26 +782,30 @@ async def get_health() -> HealthResponse:
             "last_ok_ns": health_state.cloud_last_ok_ns,
         }
 
-    return HealthResponse(
-        camera=health_state.camera,
-        lighting=health_state.lighting,
-        fps=health_state.fps,
-        latency_ms=health_state.latency_ms,
-        vision_state=vision_state,
-        cloud=cloud_state,
-    )
+    # Health changes every frame, so there is nothing to cache; returning the response
+    # directly skips re-validating our own state through HealthResponse on each poll.
+    # response_model still documents the shape in the OpenAPI schema.
+    return ORJSONResponse({
+        "camera": health_state.camera,
+        "lighting": health_state.lighting,
+        "fps": health_state.fps,
+        "latency_ms": health_state.latency_ms,
+        "vision_state": vision_state,
+        "cloud": cloud_state,
+    })
 
 
 @app.post("/session/start")
-async def start_session(payload: SessionRequest) -> JSONResponse:
+async def start_session(payload: SessionRequest) -> ORJSONResponse:
     session_state.patient_id = payload.patient_id
     session_state.routine_id = payload.routine_id
-    session_state.started_at = datetime.utcnow()
+    session_state.started_at = datetime.now(timezone.utc).isoformat()
     session_state.step_index = 0
-    LOGGER.info("Session started: %s", session_state.dict())
+    session = session_state.to_payload()
+    LOGGER.info("Session started: %s", session)
     
     # Send initial status
-    await broadcast(
+    queue_broadcast(
         {
             "type": "status",
             "camera": health_state.camera,
@@ -497,92 +817,91 @@ async def start_session(payload: SessionRequest) -> JSONResponse:
     # Immediately push Step 1 HUD (vision pipeline will add shapes on next frame)
     if _vision_pipeline and payload.routine_id:
         try:
-            # Load routine to get first step
-            from pathlib import Path
-            import json
-            tasks_path = Path(__file__).resolve().parents[1] / "config" / "tasks.json"
-            if tasks_path.exists():
-                with tasks_path.open("r") as f:
-                    tasks = json.load(f)
-                    routine_steps = tasks.get(payload.routine_id, [])
-                    if routine_steps and len(routine_steps) > 0:
-                        step = routine_steps[0]
-                        await broadcast({
-                            "type": "overlay.set",
-                            "shapes": [],  # Vision pipeline will add shapes
-                            "hud": {
-                                "title": step.get("title"),
-                                "step": f"Step 1 of {len(routine_steps)}",
-                                "subtitle": step.get("subtitle"),
-                                "time_left_s": step.get("min_time_s"),
-                                "max_time_s": step.get("min_time_s"),
-                                "hint": step.get("hint"),
-                            }
-                        })
+            hud = _first_step_hud(payload.routine_id)
+            if hud is not None:
+                queue_broadcast(hud)
         except Exception as exc:
             LOGGER.warning("Failed to send initial HUD: %s", exc)
     
-    # Use jsonable_encoder for safe datetime serialization
-    try:
-        from fastapi.encoders import jsonable_encoder
-        session_payload = jsonable_encoder(session_state)
-    except Exception as exc:
-        # Fallback: manual ISO conversion
-        LOGGER.debug("jsonable_encoder unavailable, using manual conversion: %s", exc)
-        session_payload = session_state.dict()
-        if isinstance(session_payload.get("started_at"), datetime):
-            session_payload["started_at"] = session_payload["started_at"].isoformat() + "Z"
-    return JSONResponse({"status": "started", "session": session_payload})
+    return ORJSONResponse({"status": "started", "session": session})
 
 
 @app.post("/session/next_step")
-async def next_step() -> JSONResponse:
+async def next_step() -> ORJSONResponse:
     session_state.step_index += 1
     LOGGER.info("Advanced to step %d", session_state.step_index)
-    return JSONResponse({"step_index": session_state.step_index})
+    return ORJSONResponse({"step_index": session_state.step_index})
 
 
 @app.post("/session/prev_step")
-async def prev_step() -> JSONResponse:
+async def prev_step() -> ORJSONResponse:
     session_state.step_index = max(0, session_state.step_index - 1)
     LOGGER.info("Rewound to step %d", session_state.step_index)
-    return JSONResponse({"step_index": session_state.step_index})
+    return ORJSONResponse({"step_index": session_state.step_index})
+
+
+_OK_BODY = b'{"ok":true}'
 
 
 @app.post("/overlay")
-async def post_overlay(raw: Dict[str, Any]) -> JSONResponse:
+async def post_overlay(request: Request) -> Response:
+    # Parse the body directly; FastAPI's model validation is skipped on this hot path
+    body = await request.body()
+    try:
+        raw = orjson.loads(body)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail="Invalid JSON body") from exc
+    if not isinstance(raw, dict):
+        raise HTTPException(status_code=422, detail="Overlay body must be a JSON object")
     # Accept either {"message": {...}} or raw overlay payload
     if "message" in raw and isinstance(raw["message"], dict):
         payload = raw["message"]
     else:
         payload = raw
-    if "type" not in payload:
+    msg_type = payload.get("type")
+    if msg_type is None:
         # Wrap arbitrary payload
         payload = {
             "type": "overlay.set",
             "shapes": [],
             "hud": payload,
         }
-    await broadcast(payload)
-    LOGGER.info("Broadcast overlay message %s", payload.get("type"))
-    return JSONResponse({"ok": True})
+        queue_broadcast(payload)
+    elif not isinstance(msg_type, str) or msg_type not in _OVERLAY_MESSAGE_TYPES:
+        # isinstance first: an unhashable type value (list/dict) would raise in the set lookup
+        raise HTTPException(status_code=422, detail=f"Unsupported message type: {msg_type}")
+    elif payload is raw:
+        # Already a complete message: forward the request bytes without re-serialising
+        queue_broadcast(body)
+    else:
+        queue_broadcast(payload)
+    LOGGER.debug("Broadcast overlay message %s", payload.get("type"))
+    return Response(content=_OK_BODY, media_type="application/json")
 
 
 @app.post("/tts")
-async def post_tts(payload: TTSRequest) -> JSONResponse:
-    text = payload.text.strip()
-
-    loop = asyncio.get_running_loop()
-    await loop.run_in_executor(_executor, speak_text, text)
-
-    await broadcast({"type": "tts", "text": text})
+async def post_tts(payload: TTSRequest) -> ORJSONResponse:
+    text = payload.text
+    # Single-flight: a repeat of text that is being spoken, or was just spoken, is dropped
+    # instead of being spoken twice
+    last_text, last_done = _tts_last
+    if text in _tts_inflight or (
+        text == last_text and time.monotonic() - last_done < _TTS_DEDUPE_WINDOW_S
+    ):
+        LOGGER.debug("Skipping duplicate TTS request length=%d", len(text))
+        return ORJSONResponse({"status": "ok", "deduped": True})
+
+    if queue_tts(text):
+        _tts_inflight.add(text)  # cleared by the worker once spoken
+
+    queue_broadcast({"type": "tts", "text": text})
     LOGGER.info("Queued TTS text length=%d", len(text))
-    return JSONResponse({"status": "ok"})
+    return ORJSONResponse({"status": "ok"})
 
 
 @app.post("/settings")
-async def update_settings(payload: SettingsPayload) -> JSONResponse:
-    updated = payload.dict(exclude_none=True)
+async def update_settings(payload: SettingsPayload) -> ORJSONResponse:
+    updated = payload.model_dump(exclude_none=True)
     for key, value in updated.items():
         setattr(settings_state, key, value)
     # Clamp aruco_stride if provided
@@ -603,22 +922,27 @@ async def update_settings(payload: SettingsPayload) -> JSONResponse:
     LOGGER.info("Settings updated: %s", updated)
     # Notify clients when reduce_motion changes so UIs can adjust animations
     if "reduce_motion" in updated:
-        await broadcast({
+        queue_broadcast({
             "type": "status",
             "camera": health_state.camera,
             "lighting": health_state.lighting,
             "fps": health_state.fps,
             "reduce_motion": settings_state.reduce_motion,
         })
-    return JSONResponse(settings_state.dict())
+    return ORJSONResponse(asdict(settings_state))
 
 
 @app.get("/preview.jpg")
-async def get_preview() -> Response:
-    frame = await get_preview_frame()
-    if frame is None:
+async def get_preview(request: Request) -> Response:
+    preview = _preview
+    if preview is None:
         raise HTTPException(status_code=404, detail="Preview unavailable")
-    return Response(content=frame, media_type="image/jpeg")
+    frame, etag = preview
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    # Pollers that already hold this frame get an empty 304 instead of the JPEG again
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=frame, media_type="image/jpeg", headers=headers)
 
 
 @app.post("/voice/converse", response_model=VoiceResponse)
@@ -632,18 +956,27 @@ async def voice_converse(
     suffix = Path(file.filename or "audio.wav").suffix or ".wav"
     temp_path = None
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            temp_path = Path(tmp.name)
-            data = await file.read()
-            tmp.write(data)
+        # Stream the upload to disk in chunks; file I/O and the STT/LLM/TTS round trip
+        # are blocking, so keep them off the event loop thread.
+        tmp = await asyncio.to_thread(tempfile.NamedTemporaryFile, delete=False, suffix=suffix)
+        temp_path = Path(tmp.name)
+        try:
+            while chunk := await file.read(_UPLOAD_CHUNK_BYTES):
+                await asyncio.to_thread(tmp.write, chunk)
+        finally:
+            await asyncio.to_thread(tmp.close)
 
-        result = _voice_assistant.converse_with_details(str(temp_path), play_audio=False)
+        result = await asyncio.to_thread(
+            _voice_assistant.converse_with_details, str(temp_path), play_audio=False
+        )
         if not result:
             raise HTTPException(status_code=502, detail="Unable to process audio input")
 
         audio_b64 = None
+        audio_format = None
         if include_audio and result.audio_bytes:
             audio_b64 = base64.b64encode(result.audio_bytes).decode("utf-8")
+            audio_format = getattr(_voice_assistant.speaker, "audio_format", "mp3")
 
         LOGGER.info(
             "Voice assistant handled request (transcript_length=%s response_length=%s)",
@@ -655,11 +988,12 @@ async def voice_converse(
             transcript=result.transcript,
             response_text=result.response_text,
             audio_b64=audio_b64,
+            audio_format=audio_format,
         )
     finally:
-        if temp_path and temp_path.exists():
+        if temp_path is not None:
             with contextlib.suppress(Exception):
-                temp_path.unlink()
+                await asyncio.to_thread(temp_path.unlink, missing_ok=True)
 
 
 # ============================================================================
@@ -667,32 +1001,36 @@ async def voice_converse(
 # ============================================================================
 
 @app.get("/tasks")
-async def list_tasks() -> JSONResponse:
+async def list_tasks() -> Response:
     """Get list of all available tasks"""
-    tasks = get_all_tasks()
-    return JSONResponse({"tasks": tasks})
+    return Response(content=_tasks_body(), media_type="application/json")
+
+
+@lru_cache(maxsize=1)
+def _tasks_body() -> bytes:
+    # The task catalogue is static, so encode it once and serve the same bytes
+    return orjson.dumps({"tasks": get_all_tasks()})
 
 
 @app.post("/tasks/{task_id}/start")
-async def start_task_endpoint(task_id: str) -> JSONResponse:
+async def start_task_endpoint(task_id: str) -> ORJSONResponse:
     """Start a new task"""
-    global active_task_session
     
     # Stop any existing task
-    if active_task_session:
-        await broadcast({"type": "overlay.clear"})
+    if session_state.task_session:
+        queue_broadcast({"type": "overlay.clear"})
     
     # Start new task
     task_session = start_task(task_id)
     if not task_session:
         raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
     
-    active_task_session = task_session
+    session_state.task_session = task_session
     
     # Update session_state for vision pipeline overlay rendering
     session_state.routine_id = task_id
     session_state.step_index = 0
-    session_state.started_at = datetime.utcnow()
+    session_state.started_at = datetime.now(timezone.utc).isoformat()
     
     # Get first step
     step = task_session.get_current_step()
@@ -701,13 +1039,12 @@ async def start_task_endpoint(task_id: str) -> JSONResponse:
     
     # Speak the first instruction
     if step.voice_prompt:
-        speak_text(step.voice_prompt)
+        queue_tts(step.voice_prompt)
     
     # Send overlay
-    overlay_msg = task_session.to_overlay_message()
-    await broadcast(overlay_msg)
+    queue_broadcast(task_session.to_overlay_bytes())
     
-    return JSONResponse({
+    return ORJSONResponse({
         "ok": True,
         "task_id": task_id,
         "task_name": task_session.task.name,
@@ -717,74 +1054,71 @@ async def start_task_endpoint(task_id: str) -> JSONResponse:
 
 
 @app.post("/tasks/next_step")
-async def next_step_endpoint() -> JSONResponse:
+async def next_step_endpoint() -> ORJSONResponse:
     """Advance to next step in active task"""
-    global active_task_session
     
-    if not active_task_session:
+    if not session_state.task_session:
         raise HTTPException(status_code=400, detail="No active task")
     
     # Check if step is complete
-    if not active_task_session.check_step_complete():
-        return JSONResponse({
+    if not session_state.task_session.check_step_complete():
+        return ORJSONResponse({
             "ok": False,
             "reason": "Step requirements not met",
-            "time_left": active_task_session.get_time_left_in_step()
+            "time_left": session_state.task_session.get_time_left_in_step()
         })
     
     # Advance
-    continued = active_task_session.advance_step()
+    continued = session_state.task_session.advance_step()
     
     # Update session_state for vision pipeline
-    session_state.step_index = active_task_session.current_step - 1  # session_state is 0-indexed
+    session_state.step_index = session_state.task_session.current_step - 1  # session_state is 0-indexed
     
     if not continued:
         # Task complete!
         session_state.routine_id = None
         session_state.step_index = 0
-        await broadcast({"type": "overlay.clear"})
-        speak_text(f"Great job! You completed {active_task_session.task.name}!")
-        active_task_session = None
-        return JSONResponse({
+        queue_broadcast({"type": "overlay.clear"})
+        queue_tts(f"Great job! You completed {session_state.task_session.task.name}!")
+        session_state.task_session = None
+        return ORJSONResponse({
             "ok": True,
             "task_complete": True
         })
     
     # Get new step
-    step = active_task_session.get_current_step()
+    step = session_state.task_session.get_current_step()
     if step and step.voice_prompt:
-        speak_text(step.voice_prompt)
+        queue_tts(step.voice_prompt)
     
     # Send overlay
-    overlay_msg = active_task_session.to_overlay_message()
-    await broadcast(overlay_msg)
+    queue_broadcast(session_state.task_session.to_overlay_bytes())
     
-    return JSONResponse({
+    return ORJSONResponse({
         "ok": True,
-        "current_step": active_task_session.current_step,
-        "total_steps": len(active_task_session.task.steps)
+        "current_step": session_state.task_session.current_step,
+        "total_steps": len(session_state.task_session.task.steps)
     })
 
 
 @app.post("/tasks/stop")
-async def stop_task_endpoint() -> JSONResponse:
+async def stop_task_endpoint() -> ORJSONResponse:
     """Stop current task"""
-    global active_task_session
     
-    if not active_task_session:
-        return JSONResponse({"ok": True, "message": "No active task"})
+    if not session_state.task_session:
+        return ORJSONResponse({"ok": True, "message": "No active task"})
     
-    task_name = active_task_session.task.name
-    active_task_session = None
+    task_name = session_state.task_session.task.name
+    session_state.task_session = None
     
     # Clear session_state
     session_state.routine_id = None
     session_state.step_index = 0
     
-    await broadcast({"type": "overlay.clear"})
-    speak_text(f"Task stopped: {task_name}")
+    queue_broadcast({"type": "overlay.clear"})
+    queue_tts(f"Task stopped: {task_name}")
     
-    return JSONResponse({"ok": True, "message": f"Stopped {task_name}"})
+    return ORJSONResponse({"ok": True, "message": f"Stopped {task_name}"})
 
 # ============================================================================
 # GENAI COACHING (stub heuristics now; replace later with LLM call)
@@ -801,10 +1135,9 @@ class CoachResponse(BaseModel):
 
 @app.post("/genai/coach", response_model=CoachResponse)
 async def genai_coach(req: CoachRequest) -> CoachResponse:
-    global active_task_session
     # Derive context from active session if missing
-    task_id = req.task_id or (active_task_session.task.task_id if active_task_session else None)
-    step_num = req.step_num or (active_task_session.current_step if active_task_session else None)
+    task_id = req.task_id or (session_state.task_session.task.task_id if session_state.task_session else None)
+    step_num = req.step_num or (session_state.task_session.current_step if session_state.task_session else None)
     if not task_id or not step_num:
         raise HTTPException(status_code=400, detail="No task context available")
     task = TASKS.get(task_id)
@@ -838,36 +1171,34 @@ async def genai_coach(req: CoachRequest) -> CoachResponse:
 # ============================================================================
 
 @app.post("/tts/replay")
-async def tts_replay() -> JSONResponse:
-    global active_task_session
-    if not active_task_session:
+async def tts_replay() -> ORJSONResponse:
+    if not session_state.task_session:
         raise HTTPException(status_code=400, detail="No active task")
-    step = active_task_session.get_current_step()
+    step = session_state.task_session.get_current_step()
     if not step or not step.voice_prompt:
-        return JSONResponse({"ok": False, "reason": "No voice prompt for this step"})
-    speak_text(step.voice_prompt)
-    return JSONResponse({"ok": True})
+        return ORJSONResponse({"ok": False, "reason": "No voice prompt for this step"})
+    queue_tts(step.voice_prompt)
+    return ORJSONResponse({"ok": True})
 
 
 @app.get("/tasks/current")
-async def get_current_task() -> JSONResponse:
+async def get_current_task() -> ORJSONResponse:
     """Get current active task status"""
-    global active_task_session
     
-    if not active_task_session:
-        return JSONResponse({"active": False})
+    if not session_state.task_session:
+        return ORJSONResponse({"active": False})
     
-    step = active_task_session.get_current_step()
+    step = session_state.task_session.get_current_step()
     
-    return JSONResponse({
+    return ORJSONResponse({
         "active": True,
-        "task_id": active_task_session.task.task_id,
-        "task_name": active_task_session.task.name,
-        "current_step": active_task_session.current_step,
-        "total_steps": len(active_task_session.task.steps),
+        "task_id": session_state.task_session.task.task_id,
+        "task_name": session_state.task_session.task.name,
+        "current_step": session_state.task_session.current_step,
+        "total_steps": len(session_state.task_session.task.steps),
         "step_title": step.title if step else None,
-        "time_left_s": active_task_session.get_time_left_in_step(),
-        "state": active_task_session.state.value
+        "time_left_s": session_state.task_session.get_time_left_in_step(),
+        "state": session_state.task_session.state.value
     })
 
 
@@ -875,34 +1206,20 @@ async def get_current_task() -> JSONResponse:
 # WEBSOCKET ENDPOINTS
 # ============================================================================
 
-@app.websocket("/ws")
-async def websocket_root(websocket: WebSocket) -> None:  # new dev-friendly endpoint
-    origin = websocket.headers.get("origin")
-    if not _ws_origin_ok(origin):
-        LOGGER.info(f"WS 403 blocked origin={origin!r}")
-        await websocket.close(code=1008)
-        return
-    await manager.connect(websocket)
-    try:
-        while True:
-            # We don't currently expect messages; keep receive to detect client close
-            await websocket.receive_text()
-    except WebSocketDisconnect:
-        await manager.disconnect(websocket)
-    except Exception as exc:  # pragma: no cover
-        LOGGER.warning("WebSocket error: %s", exc)
-        await manager.disconnect(websocket)
+def _wants_msgpack(websocket: WebSocket) -> bool:
+    return msgpack is not None and websocket.query_params.get("codec") == "msgpack"
 
-@app.websocket("/ws/mirror")
-async def websocket_endpoint(websocket: WebSocket) -> None:  # legacy path preserved
+
+async def _serve_ws(websocket: WebSocket) -> None:
     origin = websocket.headers.get("origin")
     if not _ws_origin_ok(origin):
         LOGGER.info(f"WS 403 blocked origin={origin!r}")
         await websocket.close(code=1008)
         return
-    await manager.connect(websocket)
+    await manager.connect(websocket, use_msgpack=_wants_msgpack(websocket))
     try:
         while True:
+            # We don't currently expect messages; keep receive to detect client close
             await websocket.receive_text()
     except WebSocketDisconnect:
         await manager.disconnect(websocket)
@@ -911,9 +1228,14 @@ async def websocket_endpoint(websocket: WebSocket) -> None:  # legacy path prese
         await manager.disconnect(websocket)
 
 
+# /ws is the dev-friendly endpoint; /ws/mirror is the legacy path, preserved for MagicMirror
+app.add_api_websocket_route("/ws", _serve_ws)
+app.add_api_websocket_route("/ws/mirror", _serve_ws)
+
+
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
-    global _vision_pipeline
+    global _vision_pipeline, _stopping
     LOGGER.info("Shutting down backend")
     
     # Stop vision pipeline
@@ -924,11 +1246,25 @@ async def on_shutdown() -> None:
         except Exception as exc:
             LOGGER.error("Error stopping vision pipeline: %s", exc)
     
-    _executor.shutdown(wait=False)
-    if _broadcast_task:
-        _broadcast_task.cancel()
+    if _tts_task:
+        _tts_task.cancel()
         with contextlib.suppress(asyncio.CancelledError):
-            await _broadcast_task
+            await _tts_task
+    await asyncio.to_thread(_close_espeak_pipe)
+    if _pyttsx_thread is not None:
+        _pyttsx_queue.put(None)
+    if _broadcast_task:
+        # Let the worker flush what is already pending, then stop; cancel only if it stalls
+        _stopping = True
+        if _pending_event is not None:
+            _pending_event.set()
+        try:
+            await asyncio.wait_for(_broadcast_task, timeout=_SHUTDOWN_DRAIN_S)
+        except asyncio.TimeoutError:
+            LOGGER.warning("Broadcast worker did not drain within %.1fs; cancelled", _SHUTDOWN_DRAIN_S)
+        except asyncio.CancelledError:
+            pass
+    await manager.close_all(drain_timeout=_SHUTDOWN_DRAIN_S)
 
 
 _vision_pipeline: Optional[Any] = None
@@ -936,10 +1272,14 @@ _vision_pipeline: Optional[Any] = None
 
 @app.on_event("startup")
 async def on_startup() -> None:
-    global _broadcast_task, _message_queue, _event_loop, _vision_pipeline
+    global _broadcast_task, _pending_event, _event_loop, _loop_tid, _vision_pipeline
+    global _tts_queue, _tts_task
     _event_loop = asyncio.get_running_loop()
-    _message_queue = asyncio.Queue(maxsize=256)
+    _loop_tid = get_ident()
+    _pending_event = asyncio.Event()
     _broadcast_task = asyncio.create_task(_broadcast_worker())
+    _tts_queue = asyncio.Queue(maxsize=_TTS_QUEUE_MAX)
+    _tts_task = asyncio.create_task(_tts_worker())
     
     # Start vision pipeline
     try:
@@ -987,4 +1327,13 @@ if __name__ == "__main__":
 
     # Use app:app when running from backend directory, or backend.app:app from project root
     # Default to port 8000 to match MagicMirror config
-    uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=False)
+    # Pin the C-backed loop/HTTP parser from uvicorn[standard] rather than relying on "auto"
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=False,
+        loop="uvloop" if _HAS_UVLOOP else "asyncio",
+        http="httptools",
+        ws="websockets",
+    )
@@ -5,6 +5,7 @@ Compatible with OpenCV 3.4+/4.x aruco APIs.
 from __future__ import annotations
 
 import importlib
+import os
 import time
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -15,114 +16,247 @@ import logging
 LOGGER = logging.getLogger("assistivecoach.aruco")
 
 
-# --- Camera intrinsics loading (single-attempt cache) -------------------------
+# --- Camera intrinsics loading (single-attempt cache per path) ----------------
 
-_INTRINSICS_TRIED = False
-_INTRINSICS_OK = False
-_K: Optional[np.ndarray] = None
-_DIST: Optional[np.ndarray] = None
-_INTRINSICS_ERR: Optional[str] = None
+_Intrinsics = Tuple[Optional[np.ndarray], Optional[np.ndarray], bool, Optional[str]]
+_INTRINSICS_CACHE: Dict[str, _Intrinsics] = {}
 _POSE_WARNED = False
 
 
-def load_camera_intrinsics(path: str = "config/camera_intrinsics.yml") -> Tuple[Optional[np.ndarray], Optional[np.ndarray], bool, Optional[str]]:
-    global _INTRINSICS_TRIED, _INTRINSICS_OK, _K, _DIST, _INTRINSICS_ERR
-    if _INTRINSICS_TRIED:
-        return _K, _DIST, _INTRINSICS_OK, _INTRINSICS_ERR
+def _load_intrinsics_impl(path: str) -> _Intrinsics:
     fs = cv2.FileStorage(path, cv2.FILE_STORAGE_READ)
     try:
         if not fs.isOpened():
-            _INTRINSICS_OK = False
             # Prefer a clear error message for health reporting
-            _INTRINSICS_ERR = "file not found"
-            return None, None, _INTRINSICS_OK, _INTRINSICS_ERR
+            return None, None, False, "file not found"
         K = fs.getNode("K").mat()
         dist = fs.getNode("dist").mat()
         if K is None or dist is None:
-            _INTRINSICS_OK = False
-            _INTRINSICS_ERR = "missing K/dist nodes"
-            return None, None, _INTRINSICS_OK, _INTRINSICS_ERR
-        _K = K.astype(np.float64)
-        _DIST = dist.astype(np.float64)
-        _INTRINSICS_OK = True
-        _INTRINSICS_ERR = None
-        return _K, _DIST, _INTRINSICS_OK, _INTRINSICS_ERR
+            return None, None, False, "missing K/dist nodes"
+        return K.astype(np.float64), dist.astype(np.float64), True, None
     except Exception as exc:  # pragma: no cover
-        _INTRINSICS_OK = False
-        _INTRINSICS_ERR = str(exc)
-        return None, None, _INTRINSICS_OK, _INTRINSICS_ERR
+        return None, None, False, str(exc)
     finally:
-        _INTRINSICS_TRIED = True
         fs.release()
 
 
-def _get_dictionary(dict_name: str = "DICT_5X5_250") -> Any:
-    aruco = importlib.import_module("cv2.aruco")
-    name = dict_name.upper()
-    const = getattr(aruco, name, getattr(aruco, "DICT_5X5_250"))
-    get_dict = getattr(aruco, "getPredefinedDictionary", None)
-    if get_dict is None:
-        raise ImportError("cv2.aruco.getPredefinedDictionary not available")
-    return get_dict(const)
+def load_camera_intrinsics(path: str = "config/camera_intrinsics.yml") -> _Intrinsics:
+    """Return (K, dist, ok, err) for path; the file is read at most once per path."""
+    cached = _INTRINSICS_CACHE.get(path)
+    if cached is None:
+        cached = _INTRINSICS_CACHE[path] = _load_intrinsics_impl(path)
+    return cached
+
+
+# --- ArUco module, dictionaries and detectors (resolved once, not per frame) ----
+
+try:
+    _ARUCO: Any = importlib.import_module("cv2.aruco")
+except ImportError:  # pragma: no cover - requires opencv-contrib-python
+    _ARUCO = None
+
+# Optional numba: jit the per-marker smoothing/angle kernels, else fall back to NumPy
+try:
+    from numba import njit  # type: ignore[import]
+
+    _HAS_NUMBA = True
+except ImportError:  # pragma: no cover - optional dependency
+    _HAS_NUMBA = False
+
+    def njit(*args: Any, **kwargs: Any) -> Any:
+        if args and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
+
+
+# Adaptive-threshold window (min, max, step) in pixels of the image actually searched.
+# These are OpenCV's defaults; shrink them if small markers drop out after downscaling.
+ADAPTIVE_THRESH_WIN = (3, 23, 10)
+# Detection runs on a frame downscaled by this factor; corners are mapped back to full size
+DETECT_DOWNSCALE = 2
+# Smallest predefined dictionary covering the tool ids in config/tools.json (23, 42):
+# fewer codewords means fewer Hamming checks per candidate. DICT_5X5_50 is the first
+# 50 codewords of DICT_5X5_250, so the printed markers in markers/ still decode.
+DEFAULT_DICT = "DICT_5X5_50"
 
 
-def _detect_raw(gray: np.ndarray, dictionary: Any) -> Tuple[List[np.ndarray], Optional[np.ndarray]]:
-    aruco = importlib.import_module("cv2.aruco")
-    # Support both legacy detectMarkers and new ArucoDetector APIs
-    dp_create = getattr(aruco, "DetectorParameters_create", None)
+def _opencl_enabled() -> bool:
+    # Opt-in: for a 640x360 search image the upload/download can cost more than it saves
+    if str(os.getenv("ARUCO_OPENCL", "false")).lower() not in {"1", "true", "yes"}:
+        return False
+    try:
+        if not cv2.ocl.haveOpenCL():
+            return False
+        cv2.ocl.setUseOpenCL(True)
+        return bool(cv2.ocl.useOpenCL())
+    except Exception as exc:
+        LOGGER.debug("OpenCL unavailable for ArUco preprocessing: %s", exc)
+        return False
+
+
+# Resize and gray conversion run through cv2.UMat (OpenCL) when enabled; the result is
+# downloaded before detection/LK so their outputs stay plain ndarrays
+_USE_UMAT = _opencl_enabled()
+
+
+def _make_detector_params() -> Any:
+    if _ARUCO is None:
+        return None
+    # Support both legacy DetectorParameters_create and the 4.7+ class constructor
+    dp_create = getattr(_ARUCO, "DetectorParameters_create", None)
     if dp_create is not None:
         params = dp_create()
     else:
-        DP = getattr(aruco, "DetectorParameters", None)
+        DP = getattr(_ARUCO, "DetectorParameters", None)
         params = DP() if DP is not None else None
-    aruco_detector_cls = getattr(aruco, "ArucoDetector", None)
-    if aruco_detector_cls is not None and params is not None:
-        detector = aruco_detector_cls(dictionary, params)
-        corners, ids, _ = detector.detectMarkers(gray)
+    if params is not None:
+        win_min, win_max, win_step = ADAPTIVE_THRESH_WIN
+        params.adaptiveThreshWinSizeMin = win_min
+        params.adaptiveThreshWinSizeMax = win_max
+        params.adaptiveThreshWinSizeStep = win_step
+    return params
+
+
+_PARAMS = _make_detector_params()
+# ArucoDetector (4.7+) vs legacy free function is decided here, not on every call
+_USE_ARUCO_DETECTOR = _ARUCO is not None and _PARAMS is not None and hasattr(_ARUCO, "ArucoDetector")
+_DICT_CACHE: Dict[str, Any] = {}
+# Detection scratch images, only touched from the pipeline thread
+_SCRATCH: Dict[str, np.ndarray] = {}
+_gray_slot = 0
+_DETECTOR_CACHE: Dict[str, Any] = {}
+
+
+def _require_aruco() -> Any:
+    if _ARUCO is None:
+        raise ImportError("cv2.aruco module not available; install opencv-contrib-python")
+    return _ARUCO
+
+
+def _get_dictionary(dict_name: str = DEFAULT_DICT) -> Any:
+    name = dict_name.upper()
+    dictionary = _DICT_CACHE.get(name)
+    if dictionary is None:
+        aruco = _require_aruco()
+        const = getattr(aruco, name, getattr(aruco, DEFAULT_DICT))
+        get_dict = getattr(aruco, "getPredefinedDictionary", None)
+        if get_dict is None:
+            raise ImportError("cv2.aruco.getPredefinedDictionary not available")
+        dictionary = _DICT_CACHE[name] = get_dict(const)
+    return dictionary
+
+
+def _get_detector(dict_name: str) -> Any:
+    name = dict_name.upper()
+    detector = _DETECTOR_CACHE.get(name)
+    if detector is None:
+        detector = _DETECTOR_CACHE[name] = _ARUCO.ArucoDetector(_get_dictionary(name), _PARAMS)
+    return detector
+
+
+def _detect_raw(gray: np.ndarray, dict_name: str) -> Tuple[List[np.ndarray], Optional[np.ndarray]]:
+    if _USE_ARUCO_DETECTOR:
+        corners, ids, _ = _get_detector(dict_name).detectMarkers(gray)
     else:
-        detectMarkers = getattr(aruco, "detectMarkers", None)
+        detectMarkers = getattr(_require_aruco(), "detectMarkers", None)
         if detectMarkers is None:
             return [], None
-        corners, ids, _ = detectMarkers(gray, dictionary, parameters=params)
+        corners, ids, _ = detectMarkers(gray, _get_dictionary(dict_name), parameters=_PARAMS)
     return list(corners) if corners is not None else [], ids
 
 
-def detect_markers(frame_bgr: np.ndarray, dict_name: str = "DICT_5X5_250") -> List[Dict[str, Any]]:
+def _search_gray(frame: np.ndarray, downscale: int, is_rgb: bool) -> np.ndarray:
+    """Return the (downscaled) single-channel image that detection and tracking run on.
+    A 2-D (already gray) frame skips the colour conversion; is_rgb is then ignored.
+    Output alternates between two scratch buffers, so the previous call's image stays
+    valid as the optical-flow reference.
+    """
+    global _gray_slot
+    h, w = frame.shape[:2]
+    size = (w // downscale, h // downscale)
+    code = None if frame.ndim == 2 else (cv2.COLOR_RGB2GRAY if is_rgb else cv2.COLOR_BGR2GRAY)
+    if _USE_UMAT:
+        src: Any = cv2.UMat(frame)
+        if downscale > 1:
+            src = cv2.resize(src, size, interpolation=cv2.INTER_AREA)
+        gray_umat = src if code is None else cv2.cvtColor(src, code)
+        # UMat inputs would make detectMarkers/calcOpticalFlowPyrLK return UMat outputs
+        return gray_umat.get()
+    # Reuse the scratch buffers; OpenCV reallocates them if the size changes
+    key = "gray1" if _gray_slot else "gray0"
+    _gray_slot ^= 1
+    if code is not None:
+        src = frame
+        if downscale > 1:
+            src = _SCRATCH["small"] = cv2.resize(frame, size, dst=_SCRATCH.get("small"), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(src, code, dst=_SCRATCH.get(key))
+    elif downscale > 1:
+        gray = cv2.resize(frame, size, dst=_SCRATCH.get(key), interpolation=cv2.INTER_AREA)
+    else:
+        # Copy rather than alias: the caller may reuse its frame before we track from it
+        gray = _SCRATCH.get(key)
+        if gray is None or gray.shape != frame.shape:
+            gray = np.empty_like(frame)
+        np.copyto(gray, frame)
+    _SCRATCH[key] = gray
+    return gray
+
+
+def _detect_gray(gray: Any, dict_name: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Detect markers in a search image; returns (ids (N,), corners (N,4,2)) in its pixels."""
+    corners, ids = _detect_raw(gray, dict_name)
+    if ids is None or len(ids) == 0:
+        return np.empty((0,), dtype=np.int64), np.empty((0, 4, 2), dtype=np.float32)
+    return ids.reshape(-1).astype(np.int64), np.concatenate([c.reshape(1, 4, 2) for c in corners], axis=0)
+
+
+def _to_full_res(corners: np.ndarray, downscale: int) -> np.ndarray:
+    if downscale <= 1:
+        return corners
+    # Map pixel centres of the reduced image back onto the full-resolution grid
+    return (corners + 0.5) * downscale - 0.5
+
+
+def _detect_corners(
+    frame_bgr: np.ndarray, dict_name: str = DEFAULT_DICT, downscale: int = 1, is_rgb: bool = False
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Detect markers and return (ids (N,), corners (N,4,2)) in full-frame pixels."""
+    _require_aruco()
+    ids, corners = _detect_gray(_search_gray(frame_bgr, downscale, is_rgb), dict_name)
+    return ids, _to_full_res(corners, downscale)
+
+
+def detect_markers(
+    frame_bgr: np.ndarray, dict_name: str = DEFAULT_DICT, downscale: int = 1, is_rgb: bool = False
+) -> List[Dict[str, Any]]:
     """Detect ArUco markers and return id, corners, and center_px.
     Returns a list of dicts: {"id": int, "corners": [(x,y)*4], "center_px": {"x": float, "y": float}}
+    With downscale > 1 detection runs on a smaller image; coordinates are still full-frame.
+    is_rgb selects the gray conversion for RGB input, so callers need not swap channels first.
     """
     if frame_bgr is None or frame_bgr.size == 0:
         return []
-    try:
-        importlib.import_module("cv2.aruco")
-    except ImportError as exc:
-        raise ImportError("cv2.aruco module not available; install opencv-contrib-python") from exc
-
-    dictionary = _get_dictionary(dict_name)
-    gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
-    corners, ids = _detect_raw(gray, dictionary)
-    results: List[Dict[str, Any]] = []
-    if ids is None or len(ids) == 0:
-        return results
-    for i, cid in enumerate(ids.flatten().tolist()):
-        pts = corners[i].reshape(-1, 2)
-        cx = float(np.mean(pts[:, 0]))
-        cy = float(np.mean(pts[:, 1]))
-        results.append(
-            {
-                "id": int(cid),
-                "corners": [(float(x), float(y)) for x, y in pts],
-                "center_px": {"x": cx, "y": cy},
-            }
-        )
-    return results
+    ids, corners = _detect_corners(frame_bgr, dict_name, downscale, is_rgb)
+    return _markers_from(ids, corners)
 
 
-def _euler_from_rvec(rvec: np.ndarray) -> Tuple[float, float, float]:
-    R, _ = cv2.Rodrigues(rvec)
+def _markers_from(ids: np.ndarray, corners: np.ndarray, as_lists: bool = True) -> List[Dict[str, Any]]:
+    """Build marker dicts from stacked detections.
+    as_lists=False keeps each marker's corners as a (4,2) ndarray view for internal
+    consumers (estimate_pose) instead of boxing eight Python floats per marker.
+    """
+    centers = corners.mean(axis=1).tolist()
+    pts_all = [[(x, y) for x, y in pts] for pts in corners.astype(float).tolist()] if as_lists else corners
+    return [
+        {"id": cid, "corners": pts, "center_px": {"x": cx, "y": cy}}
+        for cid, pts, (cx, cy) in zip(ids.tolist(), pts_all, centers)
+    ]
+
+
+@njit(cache=True)
+def _euler_from_matrix(R: np.ndarray) -> Tuple[float, float, float]:
     sy = np.sqrt(R[0, 0] * R[0, 0] + R[1, 0] * R[1, 0])
-    singular = sy < 1e-6
-    if not singular:
+    if sy >= 1e-6:
         x = np.arctan2(R[2, 1], R[2, 2])
         y = np.arctan2(-R[2, 0], sy)
         z = np.arctan2(R[1, 0], R[0, 0])
@@ -134,115 +268,233 @@ def _euler_from_rvec(rvec: np.ndarray) -> Tuple[float, float, float]:
     return (np.degrees(z), np.degrees(y), np.degrees(x))  # yaw, pitch, roll
 
 
+def _euler_from_rvec(rvec: np.ndarray) -> Tuple[float, float, float]:
+    R, _ = cv2.Rodrigues(rvec)
+    return _euler_from_matrix(np.ascontiguousarray(R, dtype=np.float64))
+
+
+def marker_object_points(marker_size_m: float, center_xy: Tuple[float, float] = (0.0, 0.0)) -> np.ndarray:
+    """Return the (4,3) object-frame corners of a marker, in detectMarkers' corner order."""
+    h = marker_size_m / 2.0
+    cx, cy = center_xy
+    return np.array(
+        [[cx - h, cy + h, 0.0], [cx + h, cy + h, 0.0], [cx + h, cy - h, 0.0], [cx - h, cy - h, 0.0]],
+        dtype=np.float32,
+    )
+
+
+def _set_pose(m: Dict[str, Any], rvec: np.ndarray, tvec: np.ndarray, angles: Tuple[float, float, float]) -> None:
+    yaw, pitch, roll = angles
+    m["rvec"] = rvec.astype(float).tolist()
+    m["tvec"] = tvec.astype(float).tolist()
+    m["yaw_deg"] = float(yaw)
+    m["pitch_deg"] = float(pitch)
+    m["roll_deg"] = float(roll)
+
+
 def estimate_pose(
     markers: List[Dict[str, Any]],
     K: Optional[np.ndarray],
     dist: Optional[np.ndarray],
     marker_size_m: float = 0.02,
+    board_objp: Optional[Dict[int, np.ndarray]] = None,
 ) -> List[Dict[str, Any]]:
+    """Attach rvec/tvec and yaw/pitch/roll to each marker dict.
+    board_objp maps marker id -> (4,3) corners in a shared rigid board frame (see
+    marker_object_points). Visible board markers are solved together in one PnP and
+    share its rotation; any other markers get independent single-marker poses.
+    """
     if K is None or dist is None or not hasattr(cv2, "aruco"):
         return markers
     if not markers:
         return markers
 
-    # Use OpenCV helper for single-marker pose
-    for m in markers:
-        # cv2.aruco.estimatePoseSingleMarkers returns rvecs/tvecs for each marker
-        pts = np.array(m["corners"], dtype=np.float64).reshape(1, -1, 2)
-        try:
-            aruco = importlib.import_module("cv2.aruco")
-            epsm = getattr(aruco, "estimatePoseSingleMarkers", None)
-            if epsm is None:
-                continue
-            rvecs, tvecs, _obj = epsm(pts, marker_size_m, K, dist)
-        except Exception:
-            continue
-        if rvecs is None or tvecs is None:
-            continue
-        rvec = rvecs[0].reshape(3, 1)
-        tvec = tvecs[0].reshape(3, 1)
-        yaw, pitch, roll = _euler_from_rvec(rvec)
-        m["rvec"] = rvec.astype(float).tolist()
-        m["tvec"] = tvec.astype(float).tolist()
-        m["yaw_deg"] = float(yaw)
-        m["pitch_deg"] = float(pitch)
-        m["roll_deg"] = float(roll)
+    remaining = markers
+    if board_objp:
+        on_board = [m for m in markers if int(m["id"]) in board_objp]
+        if on_board:
+            objp = np.concatenate([board_objp[int(m["id"])] for m in on_board]).astype(np.float32)
+            imgp = np.concatenate([np.asarray(m["corners"], dtype=np.float32) for m in on_board]).reshape(-1, 2)
+            try:
+                ok, rvec, tvec = cv2.solvePnP(objp, imgp, K, dist, flags=cv2.SOLVEPNP_IPPE)
+            except cv2.error:
+                ok = False
+            if ok:
+                R, _ = cv2.Rodrigues(rvec)
+                angles = _euler_from_rvec(rvec)
+                for m in on_board:
+                    # Marker centre in the board frame, expressed in camera coordinates
+                    centre = board_objp[int(m["id"])].mean(axis=0).reshape(3, 1)
+                    _set_pose(m, rvec.reshape(3, 1), R @ centre + tvec.reshape(3, 1), angles)
+                remaining = [m for m in markers if int(m["id"]) not in board_objp]
+    if not remaining:
+        return markers
+
+    epsm = getattr(_ARUCO, "estimatePoseSingleMarkers", None)
+    if epsm is None:
+        return markers
+    # One call for all markers; OpenCV takes the same list of (1,4,2) float32 arrays
+    # that detectMarkers produces
+    pts = np.stack([np.asarray(m["corners"], dtype=np.float32) for m in remaining]).reshape(-1, 1, 4, 2)
+    try:
+        rvecs, tvecs, _obj = epsm(list(pts), marker_size_m, K, dist)
+    except Exception:
+        return markers
+    if rvecs is None or tvecs is None:
+        return markers
+    for m, rvec, tvec in zip(remaining, rvecs.reshape(-1, 3, 1), tvecs.reshape(-1, 3, 1)):
+        _set_pose(m, rvec, tvec, _euler_from_rvec(rvec))
     return markers
 
 
 # --- Lightweight smoothing and cached detection for subsampling ---------------
 
 _alpha = 0.4
-_prev_center: Dict[int, Tuple[float, float]] = {}
-_prev_angles: Dict[int, Tuple[float, float, float]] = {}
-_last_ts = 0.0
-_min_interval_s = 0.065  # ~15 Hz
+# Smoothing state indexed directly by marker id (dense; ids are small dictionary indices)
+_STATE_CAP = 1024
+_prev_center = np.zeros((_STATE_CAP, 2), dtype=np.float64)
+_center_seen = np.zeros(_STATE_CAP, dtype=np.bool_)
+_prev_angles = np.zeros((_STATE_CAP, 3), dtype=np.float64)
+_angles_seen = np.zeros(_STATE_CAP, dtype=np.bool_)
+_last_ts_ns = 0
+_MIN_INTERVAL_NS = 65_000_000  # ~15 Hz
 _last_anchors: List[Dict[str, Any]] = []
+# Optical-flow state between detections: previous search image, and the ids and
+# corners (search-image pixels, (4N,1,2)) aligned with _last_anchors
+_track_gray: Any = None
+_track_ids = np.empty((0,), dtype=np.int64)
+_track_pts = np.empty((0, 1, 2), dtype=np.float32)
+_LK_PARAMS = dict(winSize=(15, 15), maxLevel=2)
 _k_runtime: Optional[np.ndarray] = None
 _dist_runtime: Optional[np.ndarray] = None
 
 
-def _smooth_pair(key: int, value: Tuple[float, float]) -> Tuple[float, float]:
-    prev = _prev_center.get(key)
-    if prev is None:
-        _prev_center[key] = value
-        return value
-    sx = _alpha * value[0] + (1 - _alpha) * prev[0]
-    sy = _alpha * value[1] + (1 - _alpha) * prev[1]
-    _prev_center[key] = (sx, sy)
-    return _prev_center[key]
-
-
-def _smooth_angles(key: int, value: Tuple[float, float, float]) -> Tuple[float, float, float]:
-    prev = _prev_angles.get(key)
-    if prev is None:
-        _prev_angles[key] = value
-        return value
-    sx = _alpha * value[0] + (1 - _alpha) * prev[0]
-    sy = _alpha * value[1] + (1 - _alpha) * prev[1]
-    sz = _alpha * value[2] + (1 - _alpha) * prev[2]
-    _prev_angles[key] = (sx, sy, sz)
-    return _prev_angles[key]
+@njit(cache=True)
+def _ema_kernel(
+    state: np.ndarray, seen: np.ndarray, ids: np.ndarray, values: np.ndarray, alpha: float
+) -> np.ndarray:
+    out = np.empty_like(values)
+    for i in range(ids.shape[0]):
+        k = ids[i]
+        for j in range(values.shape[1]):
+            v = values[i, j]
+            if seen[k]:
+                v = alpha * v + (1.0 - alpha) * state[k, j]
+            out[i, j] = v
+            state[k, j] = v
+        seen[k] = True
+    return out
+
+
+def _ema_numpy(
+    state: np.ndarray, seen: np.ndarray, ids: np.ndarray, values: np.ndarray, alpha: float
+) -> np.ndarray:
+    prev = np.where(seen[ids][:, None], state[ids], values)
+    out = alpha * values + (1.0 - alpha) * prev
+    state[ids] = out
+    seen[ids] = True
+    return out
+
+
+_ema_update = _ema_kernel if _HAS_NUMBA else _ema_numpy
+
+
+def _ensure_state_capacity(max_id: int) -> None:
+    global _STATE_CAP, _prev_center, _center_seen, _prev_angles, _angles_seen
+    if max_id < _STATE_CAP:
+        return
+    cap = max(max_id + 1, _STATE_CAP * 2)
+    _prev_center = np.resize(_prev_center, (cap, 2))
+    _prev_angles = np.resize(_prev_angles, (cap, 3))
+    # np.resize repeats data; the seen masks are what gate reuse, so start them clean
+    center_seen = np.zeros(cap, dtype=np.bool_)
+    center_seen[:_STATE_CAP] = _center_seen
+    angles_seen = np.zeros(cap, dtype=np.bool_)
+    angles_seen[:_STATE_CAP] = _angles_seen
+    _center_seen, _angles_seen, _STATE_CAP = center_seen, angles_seen, cap
+
+
+def _track_anchors(frame: np.ndarray, is_rgb: bool, scale_up: float) -> List[Dict[str, Any]]:
+    """Move the last anchors with pyramidal LK flow on their corners (no detection)."""
+    global _track_gray, _track_ids, _track_pts
+    gray = _search_gray(frame, DETECT_DOWNSCALE, is_rgb)
+    try:
+        nxt, status, _err = cv2.calcOpticalFlowPyrLK(_track_gray, gray, _track_pts, None, **_LK_PARAMS)
+    except cv2.error:
+        # e.g. the frame size changed since the last detection
+        nxt = status = None
+    _track_gray = gray
+    if nxt is None or status is None:
+        _track_ids, _track_pts = _track_ids[:0], _track_pts[:0]
+        return []
+    # A marker survives only if all four of its corners were found
+    keep = status.reshape(-1, 4).all(axis=1)
+    pts = nxt.reshape(-1, 4, 2)[keep]
+    ids = _track_ids[keep]
+    _track_ids, _track_pts = ids, pts.reshape(-1, 1, 2)
+    prev = [a for a, k in zip(_last_anchors, keep.tolist()) if k]
+    full = _to_full_res(pts, DETECT_DOWNSCALE).mean(axis=1).astype(np.float64) * scale_up
+    centers = _ema_update(_prev_center, _center_seen, ids, full, _alpha)
+    anchors: List[Dict[str, Any]] = []
+    for old, mid, (sx, sy) in zip(prev, ids.tolist(), centers.tolist()):
+        # Pose is only re-solved on detection frames; carry the smoothed angles over
+        anchor = {k: v for k, v in old.items() if k in ("yaw_deg", "pitch_deg", "roll_deg")}
+        anchor.update({"aruco_id": mid, "center_px": {"x": sx, "y": sy}})
+        anchors.append(anchor)
+    return anchors
 
 
 def detect_aruco_anchors(
-    frame_rgb: np.ndarray,
+    frame: np.ndarray,
     pose_enabled: bool = True,
     intrinsics_path: str = "config/camera_intrinsics.yml",
     marker_size_m: float = 0.032,
-    dict_name: str = "DICT_5X5_250",
-<<<<<<< HEAD
-=======
+    dict_name: str = DEFAULT_DICT,
     scale_up: float = 1.0,
->>>>>>> 3fd54b7223d6d85794d599f6829e5349642b0e6f
+    is_rgb: bool = True,
+    board_objp: Optional[Dict[int, np.ndarray]] = None,
 ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
     """Convenience wrapper used by the pipeline.
-    - Subsamples detection rate (~15 Hz) and returns last anchors in between calls.
+    - Runs full detection at ~15 Hz; calls in between move the last anchors with
+      optical flow on their corners instead of returning them unchanged.
+    - Accepts RGB (default), BGR (is_rgb=False) or single-channel gray frames without a
+      channel-swap pass.
     - Applies EMA to center and (if present) Euler angles.
+    - board_objp (optional) solves markers on a known rigid layout as one PnP; see estimate_pose.
     - Adds fields used by the pipeline overlay logic: {"aruco_id", "center_px", optionally yaw/pitch/roll}.
     Returns: (anchors, meta)
       meta = {"pose_enabled": bool, "pose_available": bool, "intrinsics_error": str|None}
     """
-    global _last_ts, _last_anchors, _k_runtime, _dist_runtime, _POSE_WARNED
-    now = time.time()
-    if (now - _last_ts) < _min_interval_s and _last_anchors:
-        # Recompute meta without re-detecting
-        _, _, ok, err = load_camera_intrinsics(intrinsics_path)
+    global _last_ts_ns, _last_anchors, _k_runtime, _dist_runtime, _POSE_WARNED
+    global _track_gray, _track_ids, _track_pts
+    has_frame = frame is not None and frame.size > 0
+    # Monotonic so an NTP step can't stall or burst the gate
+    now_ns = time.monotonic_ns()
+    if (now_ns - _last_ts_ns) < _MIN_INTERVAL_NS and _last_anchors:
+        if has_frame and _track_gray is not None and len(_track_ids):
+            _last_anchors = _track_anchors(frame, is_rgb, scale_up)
+        # Recompute meta without re-detecting; intrinsics come straight from the cache
+        _, _, ok, err = _INTRINSICS_CACHE.get(intrinsics_path) or load_camera_intrinsics(intrinsics_path)
         meta = {
             "pose_enabled": bool(pose_enabled),
             "pose_available": bool(pose_enabled and ok),
             "intrinsics_error": (None if ok else err),
         }
         return _last_anchors, meta
-    _last_ts = now
+    _last_ts_ns = now_ns
 
     try:
-        frame_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
-    except Exception:
-        frame_bgr = frame_rgb
-
-    try:
-        markers = detect_markers(frame_bgr, dict_name=dict_name)
+        if has_frame:
+            _require_aruco()
+            _track_gray = _search_gray(frame, DETECT_DOWNSCALE, is_rgb)
+            _track_ids, small = _detect_gray(_track_gray, dict_name)
+            _track_pts = small.reshape(-1, 1, 2).astype(np.float32)
+            corners = _to_full_res(small, DETECT_DOWNSCALE)
+        else:
+            _track_gray = None
+            _track_ids, _track_pts = _track_ids[:0], _track_pts[:0]
+            corners = np.empty((0, 4, 2), dtype=np.float32)
+        ids = _track_ids
     except ImportError:
         # aruco not available; surface empty list (pipeline handles gracefully)
         _last_anchors = []
@@ -256,33 +508,35 @@ def detect_aruco_anchors(
     if pose_enabled and not ok and not _POSE_WARNED:
         LOGGER.warning("Pose requested but intrinsics unavailable; proceeding in 2D mode: %s", err)
         _POSE_WARNED = True
-    if pose_available and _k_runtime is not None and _dist_runtime is not None:
-        markers = estimate_pose(markers, _k_runtime, _dist_runtime, marker_size_m=marker_size_m)
-
-    anchors: List[Dict[str, Any]] = []
-    for m in markers:
-        mid = int(m["id"])  # type: ignore[index]
-        cx = float(m["center_px"]["x"])  # type: ignore[index]
-        cy = float(m["center_px"]["y"])  # type: ignore[index]
-<<<<<<< HEAD
-=======
-        # Rescale to original frame space if detection ran on downscaled image
-        cx *= scale_up
-        cy *= scale_up
->>>>>>> 3fd54b7223d6d85794d599f6829e5349642b0e6f
-        sx, sy = _smooth_pair(mid, (cx, cy))
-        anchor: Dict[str, Any] = {
-            "aruco_id": mid,
-            "center_px": {"x": sx, "y": sy},
-        }
-        if "yaw_deg" in m and "pitch_deg" in m and "roll_deg" in m:
-            yaw, pitch, roll = _smooth_angles(mid, (float(m["yaw_deg"]), float(m["pitch_deg"]), float(m["roll_deg"])) )
-            anchor.update({
-                "yaw_deg": yaw,
-                "pitch_deg": pitch,
-                "roll_deg": roll,
-            })
-        anchors.append(anchor)
+    id_list = ids.tolist()
+    if id_list:
+        _ensure_state_capacity(max(id_list))
+    # Rescale to original frame space if detection ran on downscaled image
+    centers = _ema_update(
+        _prev_center, _center_seen, ids, corners.mean(axis=1).astype(np.float64) * scale_up, _alpha
+    )
+    anchors: List[Dict[str, Any]] = [
+        {"aruco_id": mid, "center_px": {"x": sx, "y": sy}}
+        for mid, (sx, sy) in zip(id_list, centers.tolist())
+    ]
+
+    if pose_available and _k_runtime is not None and _dist_runtime is not None and id_list:
+        markers = estimate_pose(
+            _markers_from(ids, corners, as_lists=False),
+            _k_runtime,
+            _dist_runtime,
+            marker_size_m=marker_size_m,
+            board_objp=board_objp,
+        )
+        posed = [i for i, m in enumerate(markers) if "yaw_deg" in m]
+        if posed:
+            angles = np.array(
+                [(markers[i]["yaw_deg"], markers[i]["pitch_deg"], markers[i]["roll_deg"]) for i in posed],
+                dtype=np.float64,
+            )
+            smoothed = _ema_update(_prev_angles, _angles_seen, ids[posed], angles, _alpha)
+            for i, (yaw, pitch, roll) in zip(posed, smoothed.tolist()):
+                anchors[i].update({"yaw_deg": yaw, "pitch_deg": pitch, "roll_deg": roll})
 
     _last_anchors = anchors
     meta = {
@@ -10,6 +10,33 @@ import numpy as np
 
 LOGGER = logging.getLogger("assistivecoach.camera")
 
+# Preview JPEGs are only for display; quality 70 without Huffman optimisation
+# encodes several times faster than the libjpeg default of 95
+PREVIEW_JPEG_QUALITY = 70
+# Preview pollers don't need every frame; cap JPEG encoding at ~10 Hz
+PREVIEW_INTERVAL_S = 0.1
+_IMENCODE_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, PREVIEW_JPEG_QUALITY, cv2.IMWRITE_JPEG_OPTIMIZE, 0]
+
+# Optional PyTurboJPEG (SIMD libjpeg-turbo); falls back to cv2.imencode
+try:
+    from turbojpeg import TurboJPEG  # type: ignore[import]
+
+    _TURBOJPEG: Any = TurboJPEG()
+except Exception as _tj_exc:  # pragma: no cover - optional dependency / missing shared lib
+    _TURBOJPEG = None
+    LOGGER.debug("PyTurboJPEG unavailable; using cv2.imencode: %s", _tj_exc)
+
+
+def encode_preview_jpeg(frame_bgr: np.ndarray) -> Optional[bytes]:
+    """Encode a BGR frame as a preview-quality JPEG, or return None on failure."""
+    if _TURBOJPEG is not None:
+        try:
+            return _TURBOJPEG.encode(frame_bgr, quality=PREVIEW_JPEG_QUALITY)
+        except Exception as exc:
+            LOGGER.debug("TurboJPEG encode failed; falling back to OpenCV: %s", exc)
+    ok, buffer = cv2.imencode(".jpg", frame_bgr, _IMENCODE_PARAMS)
+    return buffer.tobytes() if ok else None
+
 
 class CameraCapture:
     """Background camera reader keeping a preview buffer and lighting metric.
@@ -18,16 +45,22 @@ class CameraCapture:
     the capture will synthesize frames so downstream systems can run.
     """
 
-    def __init__(self, width: int = 1280, height: int = 720, fps: int = 30, device: int = 0, health_state: Any = None, set_preview_fn: Any = None) -> None:
+    def __init__(self, width: int = 1280, height: int = 720, fps: int = 30, device: int = 0, health_state: Any = None, set_preview_fn: Any = None, preview_interval_s: float = PREVIEW_INTERVAL_S) -> None:
         # Always initialize synchronization primitives first
         self._frame_lock = threading.Lock()
         self._stop_event = threading.Event()
         self._latest_frame: Optional[np.ndarray] = None
         self._latest_ts: Optional[int] = None
+        # Two-slot ring: the capture thread fills the slot readers can't see, then
+        # publishes it under the lock, so frame buffers are reused instead of reallocated
+        self._frames: list = [None, None]
+        self._write_idx = 0
 
         # Store health_state reference
         self.health_state = health_state
         self.set_preview_fn = set_preview_fn
+        self.preview_interval_s = preview_interval_s
+        self._last_preview_ns = 0
 
         # Config
         env_idx = os.getenv("CAM_INDEX")
@@ -109,20 +142,31 @@ class CameraCapture:
         self._capture.set(cv2.CAP_PROP_FPS, self.fps)
 
     def _run(self) -> None:
-        target_period = 1.0 / float(self.fps or 30)
+        period_ns = int(1e9 / float(self.fps or 30))
+        preview_interval_ns = int(self.preview_interval_s * 1e9)
         fps_alpha = 0.2
+        # Frames are paced against absolute deadlines so sleep overshoot doesn't accumulate
+        next_deadline_ns = time.monotonic_ns() + period_ns
         while not self._stop_event.is_set():
-            start = time.time()
+            # Pacing uses the monotonic clock; the frame timestamp stays wall-clock because
+            # consumers compare it against time.time_ns()
+            start_ns = time.monotonic_ns()
             timestamp_ns = time.time_ns()
+            # Frames are kept in the camera's native BGR; RGB is produced once, on read()
+            slot = self._write_idx ^ 1
             if self.mock or self._capture is None:
                 # Synthetic frame with moving dot and timestamp
-                frame_rgb = np.zeros((self.height, self.width, 3), dtype=np.uint8)
-                t = time.time()
+                frame_bgr = self._frames[slot]
+                if frame_bgr is None or frame_bgr.shape != (self.height, self.width, 3):
+                    frame_bgr = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+                else:
+                    frame_bgr.fill(0)
+                t = start_ns * 1e-9
                 x = int((0.5 + 0.4 * np.sin(t)) * self.width)
                 y = int((0.5 + 0.4 * np.cos(t)) * self.height)
-                cv2.circle(frame_rgb, (x, y), 20, (0, 255, 0), -1)
+                cv2.circle(frame_bgr, (x, y), 20, (0, 255, 0), -1)
                 cv2.putText(
-                    frame_rgb,
+                    frame_bgr,
                     time.strftime("%H:%M:%S"),
                     (20, 40),
                     cv2.FONT_HERSHEY_SIMPLEX,
@@ -134,57 +178,74 @@ class CameraCapture:
                 self.health_state.camera = "mock"
                 self.health_state.mock_camera = True
                 self.health_state.camera_error = self.last_error
-                gray = cv2.cvtColor(cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR), cv2.COLOR_BGR2GRAY)
             else:
-                ok, frame_bgr = self._capture.read()
+                # Decode into the back slot's buffer; OpenCV reallocates if the size changed
+                ok, frame_bgr = self._capture.read(self._frames[slot])
                 if not ok:
                     # brief pause then try again
                     time.sleep(0.05)
                     continue
-                frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
-                gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
                 self.health_state.camera = "on"
                 self.health_state.mock_camera = False
                 self.health_state.camera_error = None
 
-            luminance = float(gray.mean())
+            # The ok/dim threshold doesn't need every pixel: average a strided 1/64 view
+            # (no copy) and weight the channel means as BGR2GRAY would
+            b_mean, g_mean, r_mean = frame_bgr[::8, ::8].mean(axis=(0, 1))
+            luminance = float(0.114 * b_mean + 0.587 * g_mean + 0.299 * r_mean)
             lighting = "ok" if luminance > 60 else "dim"
             self.health_state.lighting = lighting
 
+            # Encode before taking the lock; the critical section is just the reference swap
+            preview: Optional[bytes] = None
+            if self.set_preview_fn is not None and start_ns - self._last_preview_ns >= preview_interval_ns:
+                self._last_preview_ns = start_ns
+                # JPEG encoding takes BGR, so the captured frame is encoded as-is
+                preview = encode_preview_jpeg(frame_bgr)
+
+            self._frames[slot] = frame_bgr
             with self._frame_lock:
-                self._latest_frame = frame_rgb
+                self._latest_frame = frame_bgr
                 self._latest_ts = timestamp_ns
-                # Preview expects BGR
-                if self.set_preview_fn is not None:
-                    prev_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
-                    _, buffer = cv2.imencode(".jpg", prev_bgr)
-                    self.set_preview_fn(bytes(buffer))
+                self._write_idx = slot
 
-            elapsed = time.time() - start
+            if preview is not None:
+                self.set_preview_fn(preview)
+
+            now_ns = time.monotonic_ns()
+            elapsed = (now_ns - start_ns) * 1e-9
             current_fps = 1.0 / elapsed if elapsed > 0 else float(self.fps)
             self.health_state.fps = (
                 fps_alpha * current_fps + (1 - fps_alpha) * self.health_state.fps
             )
-            sleep_time = max(0.0, target_period - elapsed)
-            time.sleep(sleep_time)
+            next_deadline_ns += period_ns
+            if now_ns - next_deadline_ns > 2 * period_ns:
+                # Fell well behind (slow frame, read retry): resync instead of bursting to catch up
+                next_deadline_ns = now_ns + period_ns
+            sleep_ns = next_deadline_ns - now_ns
+            if sleep_ns > 0:
+                time.sleep(sleep_ns * 1e-9)
+
+    def read(self, out: Optional[np.ndarray] = None) -> Tuple[np.ndarray, int]:
+        """Return a private RGB copy of the latest frame and its capture timestamp.
 
-    def read(self) -> Tuple[np.ndarray, int]:
+        Pass the array returned by the previous call as ``out`` to convert into it
+        instead of allocating a new frame; a buffer of the wrong shape is replaced.
+        """
         with self._frame_lock:
             if self._latest_frame is None or self._latest_ts is None:
                 raise RuntimeError("Camera frame not ready")
-            frame = self._latest_frame.copy()
-            ts = int(self._latest_ts)
-        return frame, ts
+            # The conversion writes a separate array, so it doubles as the defensive copy.
+            # It runs under the lock because the published slot is recycled by the
+            # capture thread once the next frame is published.
+            return cv2.cvtColor(self._latest_frame, cv2.COLOR_BGR2RGB, dst=out), int(self._latest_ts)
 
     def get_preview_jpeg(self) -> Optional[bytes]:
         with self._frame_lock:
             if self._latest_frame is None:
                 return None
-            frame_bgr = cv2.cvtColor(self._latest_frame, cv2.COLOR_RGB2BGR)
-            ok, buffer = cv2.imencode(".jpg", frame_bgr)
-            if not ok:
-                return None
-            return bytes(buffer)
+            # Encode under the lock: the published slot is reused two frames later
+            return encode_preview_jpeg(self._latest_frame)
 
     def close(self) -> None:
         try:
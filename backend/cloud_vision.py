@@ -1,12 +1,16 @@
 """Google Cloud Vision helper client for optional landmark refinement."""
 from __future__ import annotations
 
+import hashlib
 import logging
 import os
+import queue
+import random
+import tempfile
 import threading
 import time
-from collections import OrderedDict, deque
-from typing import Any, Deque, Dict, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import cv2
 import numpy as np
@@ -14,6 +18,42 @@ import numpy as np
 
 LOGGER = logging.getLogger("assistivecoach.cloud")
 
+# Errors that won't succeed on retry (bad request, auth/quota config, missing resource)
+try:
+    from google.api_core import exceptions as _gexc  # type: ignore[import]
+
+    _NON_RETRYABLE: Tuple[type, ...] = (_gexc.InvalidArgument, _gexc.PermissionDenied, _gexc.NotFound)
+except Exception:  # pragma: no cover - optional dependency
+    _NON_RETRYABLE = ()
+
+# Exact-duplicate key for the raw JPEG bytes; xxh3 when available, else a short blake2b
+try:
+    import xxhash  # type: ignore[import]
+
+    def _bytes_digest(data: bytes) -> bytes:
+        return xxhash.xxh3_64_digest(data)
+
+except ImportError:  # pragma: no cover - optional dependency
+
+    def _bytes_digest(data: bytes) -> bytes:
+        return hashlib.blake2b(data, digest_size=8).digest()
+
+# Lazily created PyTurboJPEG encoder (SIMD libjpeg-turbo); False once known unavailable
+_TJ: Any = None
+
+
+def _turbojpeg() -> Any:
+    global _TJ
+    if _TJ is None:
+        try:
+            from turbojpeg import TurboJPEG  # type: ignore[import]
+
+            _TJ = TurboJPEG()
+        except Exception as exc:  # pragma: no cover - optional dependency / missing shared lib
+            LOGGER.debug("PyTurboJPEG unavailable; ROI encoding uses cv2.imencode: %s", exc)
+            _TJ = False
+    return _TJ or None
+
 
 class CloudVisionClient:
     """Wrapper around Google Cloud Vision FACE_DETECTION with rate limits and caching."""
@@ -21,14 +61,27 @@ class CloudVisionClient:
     _CACHE_TTL_S = 10.0
     _CACHE_MAX = 32
     _BREAKER_OPEN_SECONDS = 10
+    # Micro-batching: Vision accepts up to 16 images per BatchAnnotateImages call
+    _BATCH_MAX = 16
+    _BATCH_WAIT_S = 0.02
+    _MAX_ATTEMPTS = 4
+    _BACKOFF_BASE_S = 0.2
+    # Opt-in on-disk layer (ASSISTIVECOACH_DISK_CACHE=1), keyed by the exact-bytes digest
+    _DISK_CACHE_DIR = os.path.join(tempfile.gettempdir(), "assistivecoach_vision")
+    # Entries are small result dicts (<1 KB), so a few MB holds thousands of them
+    _DISK_CACHE_BYTES = 4 * 1024 * 1024
+    _DISK_CACHE_TTL_S = 3600
 
     def __init__(
         self,
         rps: int = 2,
         timeout_s: float = 0.8,
         min_interval_ms: int = 600,
+        batch_enabled: bool = True,
     ) -> None:
         self.enabled = False
+        # Coalesce concurrent callers into one RPC; False sends each request on its own
+        self.batch_enabled = bool(batch_enabled)
         self.rps = max(1, int(rps))
         self.timeout_s = max(0.1, float(timeout_s))
         self.min_interval_ms = max(0, int(min_interval_ms))
@@ -36,18 +89,38 @@ class CloudVisionClient:
         self.ok_count = 0
         self.fail_count = 0
         self.last_ok_ns: Optional[int] = None
-        self.breaker_open = False
+        # Set while the breaker is open; readable without the lock on the per-frame fast path
+        self._breaker_open_event = threading.Event()
 
         self._lock = threading.Lock()
-        self._call_times: Deque[float] = deque()
+        # Token bucket: up to rps calls in a burst, refilled lazily at rps tokens/s
+        self._tokens: float = float(self.rps)
+        self._last_refill_ns = time.time_ns()
         self._last_call_ns = 0
         self._consecutive_failures = 0
         self._breaker_until_ns = 0
         self._last_latency_ms: float = 0.0
-        self._cache: OrderedDict[str, Tuple[float, Optional[Dict[str, Any]]]] = OrderedDict()
+        # Hash scratch buffers, per thread: detect_faces_async hashes on several workers
+        # at once and cv2 releases the GIL, so shared buffers would mix images
+        self._scratch = threading.local()
+        self._batch_queue: "queue.SimpleQueue[Optional[Tuple[Any, Future]]]" = queue.SimpleQueue()
+        self._batch_thread: Optional[threading.Thread] = None
+        # Callers admitted past the rate limiter that have not queued their request yet;
+        # the batch worker only lingers for them, so a lone caller is sent immediately
+        self._batch_expected = 0
+        # Created on first detect_faces_async so sync-only users don't start threads
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._disk: Any = self._open_disk_cache()
+        # Plain dict as LRU: insertion order is recency (pop + reinsert on write).
+        # str keys are perceptual hashes, bytes keys are exact digests of the JPEG payload.
+        self._cache: Dict[Union[str, bytes], Tuple[float, Optional[Dict[str, Any]]]] = {}
 
         self._vision: Any = None
         self._client: Any = None
+        # Landmark names we extract -> Vision landmark type, resolved once when Vision loads
+        self._landmark_targets: Dict[str, Any] = {}
+        # FACE_DETECTION feature proto, built once and shared by every request
+        self._face_feature: Any = None
 
         creds_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
         try:
@@ -55,6 +128,18 @@ class CloudVisionClient:
 
             if creds_path:
                 self._vision = vision
+                lm_type = vision.FaceAnnotation.Landmark.Type  # type: ignore[attr-defined]
+                self._landmark_targets = {
+                    "mouth_center": lm_type.MOUTH_CENTER,
+                    "mouth_left": lm_type.MOUTH_LEFT,
+                    "mouth_right": lm_type.MOUTH_RIGHT,
+                    "cheek_left": lm_type.LEFT_CHEEK_CENTER,
+                    "cheek_right": lm_type.RIGHT_CHEEK_CENTER,
+                }
+                # Only annotations[0] is ever read, so don't ask for more faces
+                self._face_feature = vision.Feature(  # type: ignore[attr-defined]
+                    type_=vision.Feature.Type.FACE_DETECTION, max_results=1
+                )
                 self._client = vision.ImageAnnotatorClient()  # type: ignore[attr-defined]
                 self.enabled = True
                 LOGGER.info("CloudVisionClient enabled (credentials detected)")
@@ -70,9 +155,14 @@ class CloudVisionClient:
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
+    @property
+    def breaker_open(self) -> bool:
+        return self._breaker_open_event.is_set()
+
     def update_limits(self, rps: int, timeout_s: float, min_interval_ms: int) -> None:
         with self._lock:
             self.rps = max(1, int(rps))
+            self._tokens = min(self._tokens, float(self.rps))
             self.timeout_s = max(0.1, float(timeout_s))
             self.min_interval_ms = max(0, int(min_interval_ms))
 
@@ -81,16 +171,40 @@ class CloudVisionClient:
             return None
 
         now_ns = time.time_ns()
-        now = time.time()
+        now = now_ns / 1e9
 
-        with self._lock:
-            if self.breaker_open and now_ns < self._breaker_until_ns:
+        if self._breaker_open_event.is_set():
+            if now_ns < self._breaker_until_ns:
                 LOGGER.debug("CloudVisionClient breaker open; skipping request")
                 return None
-            if self.breaker_open and now_ns >= self._breaker_until_ns:
-                LOGGER.info("CloudVisionClient breaker reset after cooldown")
-                self.breaker_open = False
-                self._consecutive_failures = 0
+            # Cooldown elapsed: only this edge needs the lock
+            with self._lock:
+                if self._breaker_open_event.is_set() and now_ns >= self._breaker_until_ns:
+                    LOGGER.info("CloudVisionClient breaker reset after cooldown")
+                    self._breaker_open_event.clear()
+                    self._consecutive_failures = 0
+
+        # Byte-identical resend: answer from cache before any decode or hashing
+        exact_key = _bytes_digest(image_bytes)
+        with self._lock:
+            cached = self._cache.get(exact_key)
+            if cached and (now - cached[0]) <= self._CACHE_TTL_S:
+                LOGGER.debug("CloudVisionClient returning cached result (exact)")
+                return cached[1]
+        if self._disk is not None:
+            stored = self._disk.get(exact_key)
+            if stored is not None:
+                # Replayed from an earlier run: restamp so consumers treat it as fresh
+                result = dict(stored, ts_ns=now_ns)
+                with self._lock:
+                    self._cache_put_locked(exact_key, (now, result))
+                LOGGER.debug("CloudVisionClient returning disk-cached result")
+                return result
+
+        # Lock-free hint: skip decode + hash when the bucket is clearly empty
+        if self._likely_throttled(now_ns):
+            LOGGER.debug("CloudVisionClient rate limited")
+            return None
 
         roi_bgr = self._decode(image_bytes)
         if roi_bgr is None:
@@ -112,33 +226,70 @@ class CloudVisionClient:
                 LOGGER.debug("CloudVisionClient rate limited")
                 return None
 
-        delays = (0.0, 0.2, 0.4, 0.8)
-        image = self._vision.Image(content=image_bytes)  # type: ignore[attr-defined]
+        vision = self._vision
+        request = vision.AnnotateImageRequest(  # type: ignore[attr-defined]
+            image=vision.Image(content=image_bytes), features=[self._face_feature]
+        )
+        if self.batch_enabled:
+            with self._lock:
+                self._batch_expected += 1
         start_ns = time.time_ns()
         last_error: Optional[Exception] = None
-
-        for delay in delays:
-            if delay:
-                time.sleep(delay)
+        # Jittered exponential backoff, bounded by attempts and an overall deadline
+        deadline = time.monotonic() + self.timeout_s * 3
+        for attempt in range(self._MAX_ATTEMPTS):
+            if attempt:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                backoff = self._BACKOFF_BASE_S * (2 ** (attempt - 1)) * (0.5 + random.random())
+                time.sleep(min(backoff, remaining))
             try:
-                response = self._client.face_detection(image=image, timeout=self.timeout_s)  # type: ignore[attr-defined]
+                response = self._annotate(request, first_attempt=not attempt)
                 if response.error.message:  # type: ignore[attr-defined]
                     raise RuntimeError(response.error.message)  # noqa: TRY003
-                result = self._parse_response(response, width, height)
-                latency_ms = (time.time_ns() - start_ns) / 1e6
+                # One clock read stamps the result, the latency and last_ok_ns
+                end_ns = time.time_ns()
+                result = self._parse_response(response, width, height, end_ns)
                 if result:
-                    result["latency_ms"] = latency_ms
-                self._register_success(cache_key, result)
+                    result["latency_ms"] = (end_ns - start_ns) / 1e6
+                self._register_success(cache_key, result, exact_key, end_ns)
+                if self._disk is not None and result is not None:
+                    self._disk.set(exact_key, result, expire=self._DISK_CACHE_TTL_S)
                 return result
             except Exception as exc:  # pragma: no cover - external dependency errors
                 last_error = exc
                 LOGGER.debug("CloudVisionClient request failed: %s", exc)
+                if isinstance(exc, _NON_RETRYABLE):
+                    break
 
-        self._register_failure()
+        self._register_failure((time.time_ns() - start_ns) / 1e6)
         if last_error:
             LOGGER.warning("CloudVisionClient failure after retries: %s", last_error)
         return None
 
+    def detect_faces_async(self, image_bytes: bytes) -> "Future[Optional[Dict[str, Any]]]":
+        """Run detect_faces on a worker pool so callers can encode the next frame meanwhile.
+        Rate limiting and the breaker still gate each call exactly as in detect_faces.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(2, self.rps * 2), thread_name_prefix="cloudvision"
+                )
+            executor = self._executor
+        return executor.submit(self.detect_faces, image_bytes)
+
+    def shutdown(self) -> None:
+        """Stop the async pool and batching worker; pending async calls are cancelled."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            batch_thread, self._batch_thread = self._batch_thread, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if batch_thread is not None and batch_thread.is_alive():
+            self._batch_queue.put(None)
+
     def metrics(self) -> Dict[str, Any]:
         with self._lock:
             return {
@@ -160,7 +311,9 @@ class CloudVisionClient:
         bbox: Tuple[int, int, int, int],
         pad: float = 0.2,
         jpeg_quality: int = 70,
+        is_rgb: bool = False,
     ) -> bytes:
+        # is_rgb: frame_bgr is really RGB; only the cropped ROI gets channel-swapped (if at all)
         x, y, w, h = bbox
         pad_w = int(w * pad)
         pad_h = int(h * pad)
@@ -171,76 +324,212 @@ class CloudVisionClient:
         roi = frame_bgr[y1:y2, x1:x2]
         if roi.size == 0:
             return b""
-        encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), int(jpeg_quality)]
+        tj = _turbojpeg()
+        if tj is not None:
+            try:
+                from turbojpeg import TJFLAG_FASTDCT, TJPF_BGR, TJPF_RGB, TJSAMP_420  # type: ignore[import]
+
+                # encode() returns bytes directly, so there is no ndarray -> bytes copy
+                return tj.encode(
+                    roi,
+                    quality=int(jpeg_quality),
+                    pixel_format=TJPF_RGB if is_rgb else TJPF_BGR,
+                    jpeg_subsample=TJSAMP_420,
+                    flags=TJFLAG_FASTDCT,
+                )
+            except Exception as exc:
+                LOGGER.debug("TurboJPEG ROI encode failed; falling back to OpenCV: %s", exc)
+        # No second Huffman pass / progressive scan: the payload is decoded once, by Vision
+        encode_params = [
+            int(cv2.IMWRITE_JPEG_QUALITY),
+            int(jpeg_quality),
+            int(cv2.IMWRITE_JPEG_OPTIMIZE),
+            0,
+            int(cv2.IMWRITE_JPEG_PROGRESSIVE),
+            0,
+        ]
+        if is_rgb:
+            roi = cv2.cvtColor(roi, cv2.COLOR_RGB2BGR)
         ok, buffer = cv2.imencode(".jpg", roi, encode_params)
         if not ok:
             return b""
-        return bytes(buffer)
+        return buffer.tobytes()
+
+    def _annotate(self, request: Any, first_attempt: bool = False) -> Any:
+        """Run FACE_DETECTION for one prepared AnnotateImageRequest, directly or batched."""
+        if not self.batch_enabled:
+            # Straight to the RPC; face_detection()/annotate_image() would rebuild the same request
+            response = self._client.batch_annotate_images(requests=[request], timeout=self.timeout_s)  # type: ignore[attr-defined]
+            return response.responses[0]
+        self._ensure_batch_thread()
+        future: Future = Future()
+        with self._lock:
+            # Queue and uncount together so the worker never sees this caller twice or not at all
+            if first_attempt:
+                self._batch_expected -= 1
+            self._batch_queue.put((request, future))
+        return future.result(timeout=self.timeout_s + self._BATCH_WAIT_S)
 
-    def _register_success(self, cache_key: str, result: Optional[Dict[str, Any]]) -> None:
-        now = time.time()
+    def _ensure_batch_thread(self) -> None:
+        with self._lock:
+            if self._batch_thread is None or not self._batch_thread.is_alive():
+                self._batch_thread = threading.Thread(
+                    target=self._batch_loop, name="CloudVisionBatch", daemon=True
+                )
+                self._batch_thread.start()
+
+    def _batch_loop(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._batch_queue.get()
+            if first is None:
+                return
+            batch = [first]
+            # Collect what is already queued, and wait out the window only while admitted
+            # callers are still on their way here
+            deadline = time.monotonic() + self._BATCH_WAIT_S
+            while len(batch) < self._BATCH_MAX:
+                try:
+                    item = self._batch_queue.get_nowait()
+                except queue.Empty:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or self._batch_expected <= 0:
+                        break
+                    try:
+                        item = self._batch_queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                if item is None:
+                    # shutdown(): flush what we have, then exit
+                    stopping = True
+                    break
+                batch.append(item)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[Tuple[Any, Future]]) -> None:
+        try:
+            response = self._client.batch_annotate_images(  # type: ignore[attr-defined]
+                requests=[request for request, _ in batch], timeout=self.timeout_s
+            )
+        except Exception as exc:  # pragma: no cover - external dependency errors
+            # Each caller retries (or gives up) on its own, exactly as on the direct path
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        # Responses come back in request order
+        responses = list(response.responses)
+        for index, (_, future) in enumerate(batch):
+            if index < len(responses):
+                future.set_result(responses[index])
+            else:
+                future.set_exception(RuntimeError("Vision batch response missing an image"))
+
+    def _register_success(
+        self,
+        cache_key: str,
+        result: Optional[Dict[str, Any]],
+        exact_key: Optional[bytes] = None,
+        now_ns: Optional[int] = None,
+    ) -> None:
+        if now_ns is None:
+            now_ns = time.time_ns()
+        now = now_ns / 1e9
         with self._lock:
             self._consecutive_failures = 0
-            self.breaker_open = False
+            self._breaker_open_event.clear()
             if result and result.get("ok"):
                 self.ok_count += 1
-                self.last_ok_ns = time.time_ns()
+                self.last_ok_ns = now_ns
                 self._last_latency_ms = float(result.get("latency_ms", 0.0))
-                self._cache[cache_key] = (now, result)
-                self._cache.move_to_end(cache_key)
-                while len(self._cache) > self._CACHE_MAX:
-                    self._cache.popitem(last=False)
-            elif result is not None:
-                # Still cache negative results to avoid repeat hits.
-                self._cache[cache_key] = (now, result)
-                self._cache.move_to_end(cache_key)
-                while len(self._cache) > self._CACHE_MAX:
-                    self._cache.popitem(last=False)
-
-    def _register_failure(self) -> None:
+            if result is not None:
+                # Negative results are cached too, to avoid repeat hits.
+                self._cache_put_locked(cache_key, (now, result))
+                if exact_key is not None:
+                    self._cache_put_locked(exact_key, (now, result))
+
+    def _cache_put_locked(self, cache_key: Union[str, bytes], entry: Tuple[float, Optional[Dict[str, Any]]]) -> None:
+        self._cache.pop(cache_key, None)
+        self._cache[cache_key] = entry
+        while len(self._cache) > self._CACHE_MAX:
+            self._cache.pop(next(iter(self._cache)))
+
+    def _register_failure(self, latency_ms: float) -> None:
         with self._lock:
+            self._last_latency_ms = float(latency_ms)
             self.fail_count += 1
             self._consecutive_failures += 1
             if self._consecutive_failures >= 3:
-                self.breaker_open = True
+                # Publish the deadline before the flag so lock-free readers never see a stale one
                 self._breaker_until_ns = time.time_ns() + int(self._BREAKER_OPEN_SECONDS * 1e9)
+                self._breaker_open_event.set()
 
     def _reserve_slot_locked(self, now: float, now_ns: int) -> bool:
-        while self._call_times and (now - self._call_times[0]) > 1.0:
-            self._call_times.popleft()
+        # O(1) admission: refill from elapsed time instead of trimming a call history
+        elapsed_s = max(0, now_ns - self._last_refill_ns) / 1e9
+        self._tokens = min(float(self.rps), self._tokens + elapsed_s * self.rps)
+        self._last_refill_ns = max(self._last_refill_ns, now_ns)
 
-        if len(self._call_times) >= self.rps:
+        if self._tokens < 1.0:
             return False
 
         if self._last_call_ns and ((now_ns - self._last_call_ns) / 1e6) < self.min_interval_ms:
             return False
 
-        self._call_times.append(now)
+        self._tokens -= 1.0
         self._last_call_ns = now_ns
         return True
 
+    @classmethod
+    def _open_disk_cache(cls) -> Any:
+        if str(os.getenv("ASSISTIVECOACH_DISK_CACHE", "false")).lower() not in {"1", "true", "yes"}:
+            return None
+        try:
+            import diskcache  # type: ignore[import]
+
+            return diskcache.Cache(
+                cls._DISK_CACHE_DIR,
+                size_limit=cls._DISK_CACHE_BYTES,
+                eviction_policy="least-recently-used",
+            )
+        except Exception as exc:  # pragma: no cover - optional dependency
+            LOGGER.warning("ASSISTIVECOACH_DISK_CACHE set but diskcache unavailable: %s", exc)
+            return None
+
+    def _likely_throttled(self, now_ns: int) -> bool:
+        # Unlocked read of the bucket; a stale view only delays the real check in _reserve_slot_locked
+        last_call_ns = self._last_call_ns
+        if last_call_ns and ((now_ns - last_call_ns) / 1e6) < self.min_interval_ms:
+            return True
+        elapsed_s = max(0, now_ns - self._last_refill_ns) / 1e9
+        return self._tokens + elapsed_s * self.rps < 1.0
+
     def _cache_key(self, roi_bgr: np.ndarray) -> str:
-        phash = self._perceptual_hash(roi_bgr)
-        bucket = self._lighting_bucket(roi_bgr)
+        # One gray conversion (into a reused buffer) feeds both the hash and the lighting bucket
+        scratch = self._scratch
+        gray = scratch.gray = cv2.cvtColor(roi_bgr, cv2.COLOR_BGR2GRAY, dst=getattr(scratch, "gray", None))
+        phash = self._phash_from_gray(gray)
+        bucket = self._lighting_bucket(gray)
         return f"{phash}:{bucket}"
 
     @staticmethod
-    def _lighting_bucket(roi_bgr: np.ndarray) -> int:
-        gray = cv2.cvtColor(roi_bgr, cv2.COLOR_BGR2GRAY)
-        mean_val = float(gray.mean())
+    def _lighting_bucket(gray: np.ndarray) -> int:
+        # 20-wide bins don't need every pixel: mean of an every-8th-row/col view, no copy
+        mean_val = cv2.mean(gray[::8, ::8])[0]
         return int(mean_val // 20)
 
-    @staticmethod
-    def _perceptual_hash(roi_bgr: np.ndarray) -> str:
-        gray = cv2.cvtColor(roi_bgr, cv2.COLOR_BGR2GRAY)
-        resized = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA)
-        resized32 = resized.astype(np.float32)
-        dct = cv2.dct(resized32)
-        dct_low = np.asarray(dct[:8, :8], dtype=np.float32)
-        median_val = float(np.median(dct_low))
-        bit_array = np.greater(dct_low, median_val).flatten()
-        bits = ''.join('1' if bit else '0' for bit in bit_array)
-        return format(int(bits, 2), "016x")
+    def _phash_from_gray(self, gray: np.ndarray) -> str:
+        scratch = self._scratch
+        if not hasattr(scratch, "dct"):
+            scratch.resize = np.empty((32, 32), dtype=np.uint8)
+            scratch.dct = np.empty((32, 32), dtype=np.float32)
+        resized = cv2.resize(gray, (32, 32), dst=scratch.resize, interpolation=cv2.INTER_AREA)
+        np.copyto(scratch.dct, resized)  # uint8 -> float32 into the reused buffer
+        dct_low = cv2.dct(scratch.dct)[:8, :8]
+        # Median of 64 values via O(n) selection of the two middle elements
+        middle = np.partition(dct_low.ravel(), (31, 32))
+        median_val = (float(middle[31]) + float(middle[32])) / 2.0
+        # 64 comparisons -> 8 bytes, MSB first: same 16-hex-digit key as the old string path
+        return np.packbits(np.greater(dct_low, median_val)).tobytes().hex()
 
     @staticmethod
     def _decode(data: bytes) -> Optional[np.ndarray]:
@@ -255,6 +544,7 @@ class CloudVisionClient:
         response: Any,
         width: int,
         height: int,
+        now_ns: int,
     ) -> Optional[Dict[str, Any]]:
         annotations = getattr(response, "face_annotations", None)
         if not annotations:
@@ -262,21 +552,19 @@ class CloudVisionClient:
                 "ok": False,
                 "landmarks": {},
                 "confidence": 0.0,
-                "ts_ns": time.time_ns(),
+                "ts_ns": now_ns,
             }
 
         face = annotations[0]
-        landmark_map = {
-            "mouth_center": self._vision.FaceAnnotation.Landmark.Type.MOUTH_CENTER,  # type: ignore[attr-defined]
-            "mouth_left": self._vision.FaceAnnotation.Landmark.Type.MOUTH_LEFT,  # type: ignore[attr-defined]
-            "mouth_right": self._vision.FaceAnnotation.Landmark.Type.MOUTH_RIGHT,  # type: ignore[attr-defined]
-            "cheek_left": self._vision.FaceAnnotation.Landmark.Type.LEFT_CHEEK_CENTER,  # type: ignore[attr-defined]
-            "cheek_right": self._vision.FaceAnnotation.Landmark.Type.RIGHT_CHEEK_CENTER,  # type: ignore[attr-defined]
+        # One pass over the face's landmarks, then a dict lookup per wanted type
+        by_type = {
+            getattr(lm, "type_", None) or getattr(lm, "type", None): lm
+            for lm in (getattr(face, "landmarks", []) or [])
         }
 
         coords: Dict[str, Tuple[float, float]] = {}
-        for name, landmark_type in landmark_map.items():
-            lm = self._find_landmark(face, landmark_type)
+        for name, landmark_type in self._landmark_targets.items():
+            lm = by_type.get(landmark_type)
             if lm is None or lm.position is None:
                 continue
             coords[name] = (
@@ -296,16 +584,9 @@ class CloudVisionClient:
             "ok": ok,
             "landmarks": coords,
             "confidence": confidence,
-            "ts_ns": time.time_ns(),
+            "ts_ns": now_ns,
         }
 
-    @staticmethod
-    def _find_landmark(face: Any, landmark_type: Any) -> Optional[Any]:
-        for landmark in getattr(face, "landmarks", []) or []:
-            if getattr(landmark, "type_", None) == landmark_type or getattr(landmark, "type", None) == landmark_type:
-                return landmark
-        return None
-
 
 if __name__ == "__main__":  # pragma: no cover - manual utility
     client = CloudVisionClient()
@@ -34,10 +34,10 @@ else:
 """
 
 ### WORKFLOW WITH EYEBROW
-# get image, prep for vision api
-img = cv2.imread("backend/sample_human_face.jpeg")
-_, buffer = cv2.imencode(".jpeg", img)
-image_bytes = buffer.tobytes()
+# get image, prep for vision api: send the file bytes as-is, decode once for the pixel work
+with open("backend/sample_human_face.jpeg", "rb") as f:
+    image_bytes = f.read()
+img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
 
 # detect faces & landmarks in img
 client = CloudVisionClient(timeout_s=5)
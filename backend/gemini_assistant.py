@@ -4,7 +4,8 @@ from vertexai.generative_models import GenerativeModel
 from google.api_core.exceptions import GoogleAPICallError
 from google.auth.exceptions import DefaultCredentialsError
 import logging
-from collections import OrderedDict
+from backend.lru_cache import LRUCache
+from backend.single_flight import SingleFlight
 
 # pip3 install google-cloud-aiplatform
 
@@ -21,8 +22,10 @@ class GeminiAssistant:
     def __init__(self, project_id: str, location: str = "us-central1", model_name: str = "gemini-2.5", max_retries=3):
         self.enabled = False
         self.max_retries = max_retries
-        self.cache = OrderedDict()
-        self.max_cache_size = 100        
+        self.max_cache_size = 100
+        self.cache = LRUCache(self.max_cache_size)
+        # identical prompts issued concurrently share one RPC
+        self._inflight = SingleFlight()
         try:
             aiplatform.init(project=project_id, location=location)
             self.model = GenerativeModel(model_name)
@@ -33,9 +36,8 @@ class GeminiAssistant:
             
             
     def _cache_response(self, key: str, value: str):
-        if len(self.cache) >= self.max_cache_size:
-            self.cache.popitem(last=False)
-        self.cache[key] = value
+        # put() refreshes an existing key in place and only evicts when a new key overflows
+        self.cache.put(key, value)
 
 
     def generate_text(self, prompt: str, system_instruction: str = None) -> str:
@@ -47,9 +49,12 @@ class GeminiAssistant:
             return ""
         
         full_prompt = f"{system_instruction}\n\nUser: {prompt}" if system_instruction else prompt
-        if full_prompt in self.cache:
-            return self.cache[full_prompt]
+        cached = self.cache.get(full_prompt)
+        if cached is not None:
+            return cached
+        return self._inflight.do(full_prompt, lambda: self._generate_uncached(full_prompt))
 
+    def _generate_uncached(self, full_prompt: str) -> str:
         for attempt in range(self.max_retries):
             try:
                 response = self.model.generate_content(full_prompt)
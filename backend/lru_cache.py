@@ -0,0 +1,36 @@
+"""Small dict-based LRU cache shared by the speech and assistant clients."""
+from __future__ import annotations
+
+import threading
+from typing import Any, Hashable, Optional
+
+
+class LRUCache(dict):
+    """Plain dict kept in recency order: oldest entry first.
+
+    ``get`` promotes a hit to most-recent by pop + reinsert and ``put`` evicts from
+    the front once ``maxsize`` is exceeded; both are O(1) and hold a lock, since the
+    clients are called from worker threads concurrently. Being a dict, ``in``,
+    ``len`` and ``[key]`` behave as usual (``[key]`` does not promote).
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        super().__init__()
+        self.maxsize = max(1, int(maxsize))
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        with self._lock:
+            try:
+                value = self.pop(key)
+            except KeyError:
+                return default
+            self[key] = value
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self.pop(key, None)
+            self[key] = value
+            while len(self) > self.maxsize:
+                del self[next(iter(self))]
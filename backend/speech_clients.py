@@ -3,33 +3,49 @@ from google.api_core.exceptions import GoogleAPICallError
 from google.auth.exceptions import DefaultCredentialsError
 from pydub import AudioSegment
 from pydub.playback import play
-import io, logging, os
-from collections import OrderedDict
+import hashlib, io, logging, os, wave
+from backend.lru_cache import LRUCache
+from backend.single_flight import SingleFlight
 
-# pip3 install google-cloud-speech google-cloud-texttospeech pydub
+# pip3 install google-cloud-speech google-cloud-texttospeech pydub [simpleaudio]
+
+try:
+    import simpleaudio  # plays raw PCM directly
+except ImportError:  # pragma: no cover - optional dependency
+    simpleaudio = None
 
 # TODO: verify caching is OK
 # TODO: 2nd round of unit tests, hardware integration tests
 
 LOGGER = logging.getLogger("speechclients")
 
+# Google TTS AudioEncoding -> container/format name (pydub/ffmpeg and HTTP clients).
+# MULAW/ALAW come back inside a WAV header; LINEAR16 is WAV too but is played without ffmpeg.
+AUDIO_FORMATS = {"MP3": "mp3", "OGG_OPUS": "ogg", "LINEAR16": "wav", "MULAW": "wav", "ALAW": "wav"}
+
 class TTS:
     """
     Wrapper for Google TTS api
     text --> audio
     includes caching
     """
-    def __init__(self, language_code="en-US", gender="NEUTRAL"):
+    def __init__(self, language_code="en-US", gender="NEUTRAL", audio_encoding="MP3", sample_rate_hertz=None):
         self.voice = texttospeech.VoiceSelectionParams(
             language_code=language_code,
             ssml_gender=texttospeech.SsmlVoiceGender[gender]
         )
-        self.audio_config = texttospeech.AudioConfig(
-            audio_encoding=texttospeech.AudioEncoding.MP3
-        )
+        # MP3 by default: compact for files and /voice/converse responses. Live playback
+        # (VoiceAssistant) asks for "LINEAR16", which plays without an ffmpeg decode.
+        self.audio_encoding = audio_encoding
+        self.audio_format = AUDIO_FORMATS.get(audio_encoding, audio_encoding.lower())
+        config_kwargs = {"audio_encoding": texttospeech.AudioEncoding[audio_encoding]}
+        if sample_rate_hertz:
+            config_kwargs["sample_rate_hertz"] = sample_rate_hertz
+        self.audio_config = texttospeech.AudioConfig(**config_kwargs)
         self.enabled = False
         self.fail_count = 0
-        self.cache = OrderedDict()
+        self.cache = LRUCache(32)
+        self._inflight = SingleFlight()
         self.client = None
         
         # handling errors in initialization
@@ -52,10 +68,13 @@ class TTS:
         if not self.enabled or not text or self.client is None:
             return None
         
-        # check cache first
-        if text in self.cache:
-            return self.cache[text]
-        
+        # check cache first (a hit becomes most recently used)
+        cached = self.cache.get(text)
+        if cached is not None:
+            return cached
+        return self._inflight.do(text, lambda: self._synthesize_uncached(text, retries))
+
+    def _synthesize_uncached(self, text: str, retries: int):
         for attempt in range(retries):
             try:
                 response = self.client.synthesize_speech(
@@ -63,9 +82,7 @@ class TTS:
                     voice=self.voice, 
                     audio_config=self.audio_config
                 )
-                self.cache[text] = response
-                if len(self.cache) > 32:
-                    self.cache.popitem(last=False)
+                self.cache.put(text, response)
                 return response
             except GoogleAPICallError as e:
                 LOGGER.warning(f"TTS failed during its {attempt+1}th attempt: {e}")
@@ -73,10 +90,12 @@ class TTS:
                 LOGGER.warning(f"TTS.synthesize() encounter unexpected error: {e}")
         return None
 
-    def writeAudioOutputToFile(self, response, output_path: str = "output.mp3"):
+    def writeAudioOutputToFile(self, response, output_path: str = None):
         """
         save audio output of TTS.synthesize() to a file
         """
+        if output_path is None:
+            output_path = f"output.{self.audio_format}"
         with open(output_path, "wb") as out:
             out.write(response.audio_content)
         return output_path
@@ -85,9 +104,19 @@ class TTS:
         """
         play audio output of TTS.synthesize() out loud without saving to file
         """
-        audio_bytes = io.BytesIO(response.audio_content)
-        sound = AudioSegment.from_file(audio_bytes, format="mp3")
-        play(sound)
+        if self.audio_encoding != "LINEAR16":
+            sound = AudioSegment.from_file(io.BytesIO(response.audio_content), format=self.audio_format)
+            play(sound)
+            return
+
+        # LINEAR16 comes back as a WAV container; read the header and hand the PCM over as-is
+        with wave.open(io.BytesIO(response.audio_content), "rb") as wav:
+            channels, sample_width, frame_rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+            pcm = wav.readframes(wav.getnframes())
+        if simpleaudio is not None:
+            simpleaudio.play_buffer(pcm, channels, sample_width, frame_rate).wait_done()
+        else:
+            play(AudioSegment(data=pcm, sample_width=sample_width, frame_rate=frame_rate, channels=channels))
 
 
 
@@ -101,7 +130,11 @@ class STT:
     def __init__(self, language_code="en-US", timeout_s=10.0, max_retries=3):
         self.enabled = False
         self.language_code = language_code
-        self.cache = OrderedDict()
+        # transcripts keyed by a digest of the audio bytes, so renamed/temp copies still hit
+        self.cache = LRUCache(64)
+        # (path, size, mtime_ns) -> content digest, to skip re-reading unchanged files
+        self._digests = LRUCache(64)
+        self._inflight = SingleFlight()
         self.timeout_s = timeout_s
         self.max_retries = max_retries
         
@@ -129,12 +162,25 @@ class STT:
             LOGGER.warning(f"STT: file named {filename} is not found")
             return None
         
-        if filename in self.cache:
-            return self.cache[filename]
-        
-        # actual transcription
+        stat = os.stat(filename)
+        stat_key = (filename, stat.st_size, stat.st_mtime_ns)
+        digest = self._digests.get(stat_key)
+        if digest is not None:
+            cached = self.cache.get(digest)
+            if cached is not None:
+                return cached
+
         with open(filename, "rb") as audio_file:
             content = audio_file.read()
+        digest = hashlib.blake2b(content, digest_size=16).digest()
+        self._digests.put(stat_key, digest)
+        cached = self.cache.get(digest)
+        if cached is not None:
+            return cached
+        return self._inflight.do(digest, lambda: self._transcribe_uncached(content, digest))
+
+    def _transcribe_uncached(self, content: bytes, digest: bytes):
+        # actual transcription
         audio = speech.RecognitionAudio(content=content)
         config = speech.RecognitionConfig(
             encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
@@ -149,7 +195,7 @@ class STT:
                 if not response.results:
                     return None
                 result_text = response.results[0].alternatives[0].transcript.strip()
-                self.cache[filename] = result_text
+                self.cache.put(digest, result_text)
                 return result_text
             except GoogleAPICallError as e:
                 LOGGER.warning(f"STT.transcribe() failed attempt {attempt+1}: {e}")
@@ -2,11 +2,13 @@
 Complete Task System for AssistiveCoach
 Real ADL tasks with step-by-step guidance, ArUco markers, and TTS
 """
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 import time
 
+import orjson
+
 class TaskState(Enum):
     IDLE = "idle"
     READY = "ready"
@@ -15,7 +17,12 @@ class TaskState(Enum):
     TASK_COMPLETE = "task_complete"
     PAUSED = "paused"
 
-@dataclass
+# Step requirement bits; a step is complete once every required bit is satisfied
+REQ_TIME = 1 << 0
+REQ_MARKER = 1 << 1
+REQ_HAND_MOTION = 1 << 2
+
+@dataclass(slots=True, frozen=True)
 class TaskStep:
     """Individual step in a task"""
     step_num: int
@@ -26,8 +33,18 @@ class TaskStep:
     aruco_marker_id: Optional[int] = None  # ArUco marker to look for
     requires_hand_motion: bool = False     # Whether hand tracking is needed
     voice_prompt: Optional[str] = None     # TTS message
+    required_mask: int = field(default=REQ_TIME, init=False, repr=False)
+
+    def __post_init__(self):
+        mask = REQ_TIME
+        if self.aruco_marker_id is not None:
+            mask |= REQ_MARKER
+        if self.requires_hand_motion:
+            mask |= REQ_HAND_MOTION
+        # Frozen: derived fields are set once here, bypassing the dataclass __setattr__
+        object.__setattr__(self, "required_mask", mask)
     
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Task:
     """Complete ADL task definition"""
     task_id: str
@@ -35,16 +52,19 @@ class Task:
     category: str
     description: str
     icon: str
-    steps: List[TaskStep]
+    steps: Tuple[TaskStep, ...]  # a list is accepted and frozen into a tuple
     total_time_estimate_s: int
     difficulty: str = "easy"  # easy, medium, hard
+    _by_step_num: Dict[int, TaskStep] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Tuple keeps the frozen Task hashable and the step index from going stale
+        object.__setattr__(self, "steps", tuple(self.steps))
+        object.__setattr__(self, "_by_step_num", {step.step_num: step for step in self.steps})
     
     def get_step(self, step_num: int) -> Optional[TaskStep]:
         """Get a specific step"""
-        for step in self.steps:
-            if step.step_num == step_num:
-                return step
-        return None
+        return self._by_step_num.get(step_num)
 
 # ============================================================================
 # TASK DEFINITIONS
@@ -302,74 +322,121 @@ class TaskSession:
     task: Task
     state: TaskState = TaskState.READY
     current_step: int = 1
-    step_start_time: Optional[float] = None
-    total_start_time: Optional[float] = None
+    # time.monotonic_ns() stamps: immune to wall-clock steps, integer arithmetic
+    step_start_time: Optional[int] = None
+    total_start_time: Optional[int] = None
     last_marker_seen: Optional[int] = None
     hand_motion_detected: bool = False
+    # When False only the timer gates completion (demo/testing without a camera)
+    enforce_sensors: bool = False
+    satisfied_mask: int = 0
+    # Resolved on step transitions so per-frame polls skip the step scan
+    _num_steps: int = field(default=0, init=False, repr=False)
+    _current_step_obj: Optional[TaskStep] = field(default=None, init=False, repr=False)
+    # Static HUD fields for the current step; to_overlay_message only adds time_left_s
+    _overlay_hud: Dict[str, Any] = field(default_factory=dict, init=False, repr=False)
+    # Same message pre-encoded up to the open hud object; to_overlay_bytes appends time_left_s
+    _overlay_prefix: bytes = field(default=b"", init=False, repr=False)
+
+    def __post_init__(self):
+        self._num_steps = len(self.task.steps)
+        self._enter_step(self.current_step)
+
+    def _enter_step(self, step_num: int):
+        self.current_step = step_num
+        step = self._current_step_obj = self.task.get_step(step_num)
+        self.satisfied_mask = 0
+        self._overlay_hud = self._build_overlay_hud(step) if step else {}
+        if step:
+            static_hud = {k: v for k, v in self._overlay_hud.items() if k != "time_left_s"}
+            encoded = orjson.dumps({"type": "overlay.set", "shapes": [], "hud": static_hud})
+            self._overlay_prefix = encoded[:-2]  # strip the closing "}}"
+        else:
+            self._overlay_prefix = b""
     
     def start(self):
         """Start the task"""
         self.state = TaskState.IN_PROGRESS
-        self.current_step = 1
-        self.total_start_time = time.time()
-        self.step_start_time = time.time()
+        self._enter_step(1)
+        self.total_start_time = self.step_start_time = time.monotonic_ns()
         
     def get_current_step(self) -> Optional[TaskStep]:
         """Get current step details"""
-        return self.task.get_step(self.current_step)
+        return self._current_step_obj
     
     def get_time_left_in_step(self) -> int:
         """Get seconds remaining in current step"""
-        if not self.step_start_time:
+        if self.step_start_time is None:
             return 0
-        step = self.get_current_step()
+        step = self._current_step_obj
         if not step:
             return 0
-        elapsed = time.time() - self.step_start_time
-        remaining = max(0, step.duration_s - int(elapsed))
-        return remaining
+        elapsed_s = (time.monotonic_ns() - self.step_start_time) // 1_000_000_000
+        return max(0, step.duration_s - elapsed_s)
     
     def advance_step(self):
         """Move to next step"""
-        if self.current_step >= len(self.task.steps):
+        if self.current_step >= self._num_steps:
             self.state = TaskState.TASK_COMPLETE
             return False
         
-        self.current_step += 1
-        self.step_start_time = time.time()
+        self._enter_step(self.current_step + 1)
+        self.step_start_time = time.monotonic_ns()
         self.hand_motion_detected = False
         
-        if self.current_step > len(self.task.steps):
+        if self.current_step > self._num_steps:
             self.state = TaskState.TASK_COMPLETE
             return False
         
         return True
     
+    def observe_marker(self, marker_id: int):
+        """Record a detected ArUco marker; satisfies the step if it is the one it asks for"""
+        self.last_marker_seen = marker_id
+        step = self._current_step_obj
+        if step is not None and marker_id == step.aruco_marker_id:
+            self.satisfied_mask |= REQ_MARKER
+
+    def observe_hand_motion(self):
+        """Record hand motion for the current step"""
+        self.hand_motion_detected = True
+        self.satisfied_mask |= REQ_HAND_MOTION
+
     def check_step_complete(self) -> bool:
         """Check if current step conditions are met"""
-        step = self.get_current_step()
+        step = self._current_step_obj
         if not step:
             return False
         
-        # Time requirement
-        time_left = self.get_time_left_in_step()
-        if time_left > 0:
-            return False
-        
-        # Note: Skip ArUco/hand motion checks when camera is unavailable
-        # This allows demo/testing without camera permissions
+        if not self.satisfied_mask & REQ_TIME and self.get_time_left_in_step() == 0:
+            self.satisfied_mask |= REQ_TIME
         
-        return True
+        # ArUco/hand motion bits only count when sensors are enforced,
+        # so demo/testing works without camera permissions
+        required = step.required_mask if self.enforce_sensors else REQ_TIME
+        return (self.satisfied_mask & required) == required
     
     def to_overlay_message(self) -> Dict[str, Any]:
         """Convert to overlay message for frontend"""
-        step = self.get_current_step()
-        if not step:
+        if not self._current_step_obj:
             return {}
         
-        time_left = self.get_time_left_in_step()
-        progress = self.current_step / len(self.task.steps)
-        
+        # Fresh outer dicts per call: queued broadcasts are encoded later, so never mutate a shared one
+        hud = dict(self._overlay_hud)
+        hud["time_left_s"] = self.get_time_left_in_step()
+        return {
+            "type": "overlay.set",
+            "hud": hud,
+            "shapes": []  # Will be populated with ArUco/hand overlays
+        }
+
+    def to_overlay_bytes(self) -> bytes:
+        """to_overlay_message() as JSON bytes, spliced onto the per-step encoded prefix"""
+        if not self._overlay_prefix:
+            return b"{}"
+        return self._overlay_prefix + b',"time_left_s":%d}}' % self.get_time_left_in_step()
+
+    def _build_overlay_hud(self, step: TaskStep) -> Dict[str, Any]:
         # Lightweight, local "coach" heuristics (placeholder for GenAI)
         coach_tip = None
         if step:
@@ -390,43 +457,44 @@ class TaskSession:
                 coach_tip = "Use light, hair-like strokes; follow your natural arch."
         
         return {
-            "type": "overlay.set",
-            "hud": {
-                "title": self.task.name,
-                "step": f"Step {self.current_step} of {len(self.task.steps)}",
-                "subtitle": step.title,
-                "instruction": step.instruction,
-                "hint": step.hint,
-                "time_left_s": time_left,
-                "max_time_s": step.duration_s,
-                "progress": progress,
-                "coach_tip": coach_tip
-            },
-            "shapes": []  # Will be populated with ArUco/hand overlays
+            "title": self.task.name,
+            "step": f"Step {step.step_num} of {self._num_steps}",
+            "subtitle": step.title,
+            "instruction": step.instruction,
+            "hint": step.hint,
+            "time_left_s": 0,
+            "max_time_s": step.duration_s,
+            "progress": step.step_num / self._num_steps,
+            "coach_tip": coach_tip
         }
 
+# TASKS is static, so the menu is built once at import
+_TASKS_MENU: List[Dict[str, Any]] = [
+    {
+        "task_id": task.task_id,
+        "name": task.name,
+        "icon": task.icon,
+        "category": task.category,
+        "description": task.description,
+        "duration_s": task.total_time_estimate_s,
+        "difficulty": task.difficulty,
+        "num_steps": len(task.steps)
+    }
+    for task in TASKS.values()
+]
+
 def get_all_tasks() -> List[Dict[str, Any]]:
-    """Get list of all available tasks for menu"""
-    return [
-        {
-            "task_id": task.task_id,
-            "name": task.name,
-            "icon": task.icon,
-            "category": task.category,
-            "description": task.description,
-            "duration_s": task.total_time_estimate_s,
-            "difficulty": task.difficulty,
-            "num_steps": len(task.steps)
-        }
-        for task in TASKS.values()
-    ]
+    """Get list of all available tasks for menu (shared list; copy before mutating)"""
+    return _TASKS_MENU
+
+_get_task = TASKS.get
 
 def start_task(task_id: str) -> Optional[TaskSession]:
     """Start a new task session"""
-    task = TASKS.get(task_id)
-    if not task:
+    task = _get_task(task_id)
+    if task is None:
         return None
     
-    session = TaskSession(task=task)
+    session = TaskSession(task)
     session.start()
     return session
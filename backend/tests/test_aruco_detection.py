@@ -1,9 +1,38 @@
 import numpy as np
 import cv2
 import pytest
+
+from backend import ar_overlay
 from backend.ar_overlay import detect_markers
 
 
+def _marker_bgr(marker_id=23, size=200, offset=(100, 100)):
+    if not hasattr(cv2, 'aruco'):
+        pytest.skip('cv2.aruco not available')
+    aruco = cv2.aruco
+    dictionary = aruco.getPredefinedDictionary(aruco.DICT_5X5_250)
+    if hasattr(aruco, 'generateImageMarker'):
+        marker = aruco.generateImageMarker(dictionary, marker_id, size)
+    elif hasattr(aruco, 'drawMarker'):
+        marker = aruco.drawMarker(dictionary, marker_id, size)
+    else:
+        pytest.skip('No ArUco marker generation API available')
+    x, y = offset
+    canvas = 255 * np.ones((400, 400), dtype=np.uint8)
+    canvas[y:y+size, x:x+size] = marker
+    return cv2.cvtColor(canvas, cv2.COLOR_GRAY2BGR)
+
+
+@pytest.fixture
+def fresh_tracking(monkeypatch):
+    """Reset the module-level gate, tracking and smoothing state between tests."""
+    monkeypatch.setattr(ar_overlay, '_last_ts_ns', 0)
+    monkeypatch.setattr(ar_overlay, '_last_anchors', [])
+    monkeypatch.setattr(ar_overlay, '_track_gray', None)
+    monkeypatch.setattr(ar_overlay, '_center_seen', np.zeros_like(ar_overlay._center_seen))
+    monkeypatch.setattr(ar_overlay, '_angles_seen', np.zeros_like(ar_overlay._angles_seen))
+
+
 def test_detect_single_marker():
     if not hasattr(cv2, 'aruco'):
         pytest.skip('cv2.aruco not available')
@@ -30,3 +59,85 @@ def test_detect_single_marker():
             cy = r['center_px']['y']
             assert 100 < cx < 300 and 100 < cy < 300, 'Center out of expected range'
             break
+
+
+def test_umat_path_yields_plain_arrays(monkeypatch, fresh_tracking):
+    bgr = _marker_bgr()
+    monkeypatch.setattr(ar_overlay, '_USE_UMAT', True)
+    gray = ar_overlay._search_gray(bgr, 2, False)
+    assert isinstance(gray, np.ndarray) and gray.shape == (200, 200)
+    ids, corners = ar_overlay._detect_corners(bgr, downscale=2)
+    assert 23 in ids.tolist()
+    assert corners.shape == (len(ids), 4, 2)
+    # Detection then an in-gate call exercises the LK tracking path on UMat-fed input
+    monkeypatch.setattr(ar_overlay, '_MIN_INTERVAL_NS', 10**12)
+    first, _ = ar_overlay.detect_aruco_anchors(bgr, pose_enabled=False, is_rgb=False)
+    second, _ = ar_overlay.detect_aruco_anchors(bgr, pose_enabled=False, is_rgb=False)
+    assert [a['aruco_id'] for a in first] == [a['aruco_id'] for a in second] == [23]
+
+
+def test_tracking_moves_center_between_detections(monkeypatch, fresh_tracking):
+    monkeypatch.setattr(ar_overlay, '_MIN_INTERVAL_NS', 10**12)
+    detections = []
+    real_detect = ar_overlay._detect_gray
+
+    def counting_detect(gray, dict_name):
+        detections.append(1)
+        return real_detect(gray, dict_name)
+
+    monkeypatch.setattr(ar_overlay, '_detect_gray', counting_detect)
+    first, _ = ar_overlay.detect_aruco_anchors(_marker_bgr(offset=(100, 100)), pose_enabled=False, is_rgb=False)
+    # Second call lands inside the gate: anchors come from optical flow, not detection
+    second, _ = ar_overlay.detect_aruco_anchors(_marker_bgr(offset=(106, 104)), pose_enabled=False, is_rgb=False)
+    assert len(detections) == 1
+    assert [a['aruco_id'] for a in first] == [a['aruco_id'] for a in second] == [23]
+    # EMA (alpha 0.4) damps the 6/4 px shift, but the tracked centre must follow it
+    assert second[0]['center_px']['x'] > first[0]['center_px']['x'] + 1.0
+    assert second[0]['center_px']['y'] > first[0]['center_px']['y'] + 0.5
+
+
+def test_ema_numpy_matches_kernel():
+    rng = np.random.default_rng(0)
+    state = rng.random((16, 2))
+    seen = np.zeros(16, dtype=np.bool_)
+    seen[[3, 7]] = True
+    ids = np.array([3, 5, 7], dtype=np.int64)
+    values = rng.random((3, 2))
+    state_a, seen_a = state.copy(), seen.copy()
+    state_b, seen_b = state.copy(), seen.copy()
+    out_a = ar_overlay._ema_kernel(state_a, seen_a, ids, values, 0.4)
+    out_b = ar_overlay._ema_numpy(state_b, seen_b, ids, values, 0.4)
+    np.testing.assert_allclose(out_a, out_b)
+    np.testing.assert_allclose(state_a, state_b)
+    assert (seen_a == seen_b).all()
+    # Unseen id 5 passes through unsmoothed
+    np.testing.assert_allclose(out_b[1], values[1])
+
+
+def test_to_full_res_maps_pixel_centres():
+    corners = np.array([[[0.0, 0.0], [10.0, 0.0], [10.0, 10.0], [0.0, 10.0]]], dtype=np.float32)
+    assert ar_overlay._to_full_res(corners, 1) is corners
+    full = ar_overlay._to_full_res(corners, 2)
+    np.testing.assert_allclose(full[0, 0], (0.5, 0.5))
+    np.testing.assert_allclose(full[0, 2], (20.5, 20.5))
+
+
+def test_ensure_state_capacity_grows_and_keeps_state(monkeypatch):
+    monkeypatch.setattr(ar_overlay, '_STATE_CAP', 4)
+    monkeypatch.setattr(ar_overlay, '_prev_center', np.zeros((4, 2)))
+    monkeypatch.setattr(ar_overlay, '_center_seen', np.zeros(4, dtype=np.bool_))
+    monkeypatch.setattr(ar_overlay, '_prev_angles', np.zeros((4, 3)))
+    monkeypatch.setattr(ar_overlay, '_angles_seen', np.zeros(4, dtype=np.bool_))
+    ar_overlay._prev_center[1] = (3.0, 4.0)
+    ar_overlay._center_seen[1] = True
+
+    ar_overlay._ensure_state_capacity(2)
+    assert ar_overlay._STATE_CAP == 4
+
+    ar_overlay._ensure_state_capacity(9)
+    assert ar_overlay._STATE_CAP >= 10
+    assert ar_overlay._prev_center.shape == (ar_overlay._STATE_CAP, 2)
+    assert ar_overlay._prev_angles.shape == (ar_overlay._STATE_CAP, 3)
+    assert ar_overlay._center_seen[1] and not ar_overlay._center_seen[4:].any()
+    assert not ar_overlay._angles_seen.any()
+    np.testing.assert_allclose(ar_overlay._prev_center[1], (3.0, 4.0))
@@ -1,4 +1,6 @@
 import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
 
 from backend.cloud_vision import CloudVisionClient
 
@@ -24,3 +26,104 @@ def test_rate_limit_reservation():
     assert client._reserve_slot_locked(now, now_ns) is True
     # Third should fail within same second
     assert client._reserve_slot_locked(now, now_ns) is False
+
+
+def test_cache_key_is_thread_safe():
+    import numpy as np
+    import cv2
+    client = CloudVisionClient()
+    images = []
+    for i in range(8):
+        img = np.zeros((96 + 8 * i, 96, 3), dtype=np.uint8)
+        cv2.circle(img, (20 + 8 * i, 48), 12, (255, 255, 255), -1)
+        images.append(img)
+    expected = [client._cache_key(img) for img in images]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for _ in range(20):
+            assert list(pool.map(client._cache_key, images)) == expected
+
+
+class _StubVisionClient:
+    def __init__(self):
+        self.calls = 0
+
+    def batch_annotate_images(self, requests, timeout):
+        self.calls += 1
+        ok = SimpleNamespace(error=SimpleNamespace(message=""), face_annotations=[])
+        return SimpleNamespace(responses=[ok for _ in requests])
+
+
+def test_detect_faces_async_and_shutdown():
+    import numpy as np
+    import cv2
+    client = CloudVisionClient(rps=5, min_interval_ms=0)
+    # Stand in for the Vision API so the enabled path runs offline
+    client.enabled = True
+    client._vision = SimpleNamespace(
+        AnnotateImageRequest=lambda image, features: image,
+        Image=lambda content: content,
+    )
+    stub = client._client = _StubVisionClient()
+    img = np.full((64, 64, 3), 128, dtype=np.uint8)
+    ok, buf = cv2.imencode(".jpg", img)
+    assert ok
+
+    result = client.detect_faces_async(buf.tobytes()).result(timeout=5)
+    assert result is not None and result["ok"] is False
+    assert stub.calls == 1
+    # Byte-identical resend is answered from the cache, not the API
+    assert client.detect_faces_async(buf.tobytes()).result(timeout=5) == result
+    assert stub.calls == 1
+
+    client.shutdown()
+    assert client._executor is None
+
+
+class _GatedBatchClient(_StubVisionClient):
+    """Holds the first RPC until every other caller has queued, then records batch sizes."""
+
+    def __init__(self, vision_client, expected):
+        super().__init__()
+        self.vision_client = vision_client
+        self.expected = expected
+        self.sizes = []
+
+    def batch_annotate_images(self, requests, timeout):
+        self.sizes.append(len(requests))
+        deadline = time.monotonic() + 2.0
+        while (
+            len(self.sizes) == 1
+            and sum(self.sizes) + self.vision_client._batch_queue.qsize() < self.expected
+            and time.monotonic() < deadline
+        ):
+            time.sleep(0.005)
+        return super().batch_annotate_images(requests, timeout)
+
+
+def test_concurrent_detect_faces_share_one_batch_call():
+    import numpy as np
+    import cv2
+    n = 6
+    client = CloudVisionClient(rps=n, min_interval_ms=0)
+    client.enabled = True
+    client._vision = SimpleNamespace(
+        AnnotateImageRequest=lambda image, features: image,
+        Image=lambda content: content,
+    )
+    stub = client._client = _GatedBatchClient(client, n)
+    payloads = []
+    for seed in range(n):
+        noise = np.random.default_rng(seed).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+        ok, buf = cv2.imencode(".jpg", noise)
+        assert ok
+        payloads.append(buf.tobytes())
+
+    futures = [client.detect_faces_async(p) for p in payloads]
+    results = [f.result(timeout=5) for f in futures]
+    client.shutdown()
+
+    assert all(r is not None for r in results)
+    assert sum(stub.sizes) == n
+    # Everything queued behind the first RPC went out together in at most one more call
+    assert len(stub.sizes) <= 2
+    assert max(stub.sizes) > 1
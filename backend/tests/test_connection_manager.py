@@ -0,0 +1,43 @@
+import asyncio
+import time
+
+from backend.app import _CLIENT_QUEUE_MAX, ConnectionManager
+
+
+class _GatedWebSocket:
+    """Holds every send until ``release`` is set, simulating a slow client."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.sent = 0
+
+    async def accept(self):
+        pass
+
+    async def send_bytes(self, data):
+        await self.release.wait()
+        self.sent += 1
+
+    async def close(self, code=1000):
+        pass
+
+
+def test_close_all_returns_early_after_overflow():
+    async def scenario():
+        manager = ConnectionManager()
+        ws = _GatedWebSocket()
+        await manager.connect(ws)
+        for i in range(_CLIENT_QUEUE_MAX * 3):
+            manager.broadcast({"type": "tick", "i": i})
+        (_, queue, _), = manager._active_connections
+        assert queue.full()
+        ws.release.set()
+
+        start = time.monotonic()
+        await manager.close_all(drain_timeout=5.0)
+        return time.monotonic() - start, ws.sent
+
+    elapsed, sent = asyncio.run(scenario())
+    # Dropped frames must be marked done, or join() waits out the whole timeout
+    assert elapsed < 1.0
+    assert sent == _CLIENT_QUEUE_MAX
@@ -0,0 +1,48 @@
+import threading
+
+from backend.lru_cache import LRUCache
+
+
+def test_get_promotes_and_put_evicts_oldest():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    # "b" was least recently used once "a" was read
+    assert "b" not in cache
+    assert list(cache) == ["a", "c"]
+
+
+def test_put_existing_key_does_not_evict():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("a", 10)
+    assert len(cache) == 2
+    assert cache.get("a") == 10
+    assert cache.get("missing") is None
+
+
+def test_concurrent_get_put_keeps_bound():
+    cache = LRUCache(8)
+    errors = []
+
+    def hammer(offset):
+        try:
+            for i in range(5000):
+                key = (i + offset) % 16
+                cache.put(key, i)
+                cache.get(key)
+                cache.get((key + 1) % 16)
+        except Exception as exc:  # noqa: BLE001 - surfaced via the assertion below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=hammer, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert len(cache) <= 8
@@ -0,0 +1,57 @@
+import numpy as np
+
+from backend.vision_pipeline import VisionPipeline
+
+
+class _StubSettings:
+    use_cloud = False
+    face = False
+    hands = False
+    aruco = False
+
+
+class _StubSession:
+    routine_id = ""
+    step_index = 0
+
+
+class _StubHealth:
+    fps = 0.0
+    latency_ms = 0.0
+    camera = "off"
+    lighting = "unknown"
+    mock_camera = False
+    camera_error = None
+
+
+def test_app_wiring_publishes_throttled_preview(monkeypatch):
+    # No real device in CI: a bogus index makes CameraCapture fall back to its mock source
+    monkeypatch.setenv("CAM_INDEX", "99")
+    monkeypatch.setenv("ALLOW_MOCK", "true")
+    published = []
+    # Same arguments app.py passes at startup
+    vp = VisionPipeline(
+        broadcast_fn=lambda _msg: None,
+        settings=_StubSettings(),
+        session=_StubSession(),
+        health=_StubHealth(),
+        camera_width=320,
+        camera_height=240,
+        camera_fps=24,
+        camera_device=0,
+        preview_fn=published.append,
+    )
+    try:
+        # Only the pipeline's annotated preview is published, never a raw camera one
+        assert vp.camera.set_preview_fn is None
+        frame = np.zeros((240, 320, 3), dtype=np.uint8)
+        assert vp._publish_preview(frame) is True
+        # A second frame inside the interval is skipped rather than encoded
+        assert vp._publish_preview(frame) is False
+        assert len(published) == 1
+        assert published[0][:2] == b"\xff\xd8"
+        vp._last_preview_ns -= vp._preview_interval_ns
+        assert vp._publish_preview(frame) is True
+        assert len(published) == 2
+    finally:
+        vp.camera.close()
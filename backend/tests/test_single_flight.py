@@ -0,0 +1,28 @@
+import threading
+import time
+
+from backend.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def work():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return "done"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", work)))
+    leader.start()
+    started.wait(1.0)
+    results.append(flight.do("k", work, timeout=1.0))
+    leader.join()
+
+    assert calls == [1]
+    assert results == ["done", "done"]
+    # key is released once the call completes
+    assert flight.do("k", lambda: "again") == "again"
@@ -0,0 +1,63 @@
+import orjson
+
+from backend.task_system import TASKS, start_task
+
+
+def test_overlay_bytes_match_overlay_message():
+    for task_id in TASKS:
+        session = start_task(task_id)
+        while True:
+            assert orjson.loads(session.to_overlay_bytes()) == session.to_overlay_message()
+            if not session.advance_step():
+                break
+
+
+def _expire_timer(session):
+    session.step_start_time -= (session.get_current_step().duration_s + 1) * 1_000_000_000
+
+
+def test_enforced_marker_step_needs_matching_marker():
+    session = start_task("brush_teeth")  # step 1: marker 1, no hand motion
+    session.enforce_sensors = True
+    _expire_timer(session)
+    assert not session.check_step_complete(), "expired timer alone must not complete the step"
+    session.observe_marker(2)
+    assert not session.check_step_complete()
+    session.observe_marker(1)
+    assert session.check_step_complete()
+
+
+def test_enforced_hand_motion_step_needs_hand_motion():
+    session = start_task("brush_teeth")
+    session.enforce_sensors = True
+    assert session.advance_step()  # step 2: marker 2 + hand motion
+    _expire_timer(session)
+    session.observe_marker(2)
+    assert not session.check_step_complete()
+    session.observe_hand_motion()
+    assert session.check_step_complete()
+
+
+def test_advance_step_resets_satisfied_mask():
+    session = start_task("brush_teeth")
+    session.enforce_sensors = True
+    _expire_timer(session)
+    session.observe_marker(1)
+    assert session.check_step_complete()
+    assert session.advance_step()
+    assert session.satisfied_mask == 0
+    assert not session.check_step_complete()
+
+
+def test_timer_only_when_sensors_not_enforced():
+    session = start_task("brush_teeth")
+    assert not session.check_step_complete()
+    _expire_timer(session)
+    assert session.check_step_complete()
+
+
+def test_task_is_hashable_with_immutable_steps():
+    task = TASKS["comb_hair"]
+    assert isinstance(task.steps, tuple)
+    assert hash(task) == hash(TASKS["comb_hair"])
+    assert task.get_step(2) is task.steps[1]
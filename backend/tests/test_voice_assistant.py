@@ -199,7 +199,8 @@ class TestSTT:
                 # Second call should use cache
                 result2 = stt.transcribe(test_audio_path)
                 if result1 is not None:
-                    assert test_audio_path in stt.cache, "File should be in cache"
+                    # Keyed by audio content digest, not by path
+                    assert result1 in stt.cache.values(), "Transcript should be in cache"
                     assert result1 == result2, "Cached result should match"
 
 
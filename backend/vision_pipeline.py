@@ -14,13 +14,14 @@ from typing import Any, Callable, Dict, List, Optional, Tuple
 import cv2
 import numpy as np
 
+from backend.camera_capture import PREVIEW_INTERVAL_S, CameraCapture, encode_preview_jpeg
 from backend.cloud_vision import CloudVisionClient
 
 LOGGER = logging.getLogger("assistivecoach.vision")
 
 # OpenCV performance tuning: pin threads & enable optimizations
 try:
-    cv2.useOptimized()
+    cv2.setUseOptimized(True)
     cv2.setNumThreads(1)
 except Exception as exc:
     LOGGER.debug("OpenCV performance tuning unavailable: %s", exc)
@@ -85,31 +86,27 @@ class VisionPipeline:
         if camera_override is not None:
             self.camera = camera_override
         elif camera_enabled:
-            from backend.camera_capture import CameraCapture
-
-            preview_callback = self.set_preview_frame
-            if preview_callback is None:
+            if self.set_preview_frame is None:
                 from backend.app import set_preview_frame as _app_preview
 
-                preview_callback = _app_preview
-                self.set_preview_frame = preview_callback
-
-            camera_preview_fn = None if preview_fn is not None else preview_callback
+                self.set_preview_frame = _app_preview
 
+            # The pipeline publishes the annotated preview itself (see _publish_preview),
+            # so the camera thread doesn't encode a second, raw one
             self.camera = CameraCapture(
                 camera_width,
                 camera_height,
                 camera_fps,
                 camera_device,
                 health_state=self.health,
-                set_preview_fn=camera_preview_fn,
+                set_preview_fn=None,
             )
         else:
             class _DummyCamera:
                 def __init__(self, width: int, height: int) -> None:
                     self.width = width
                     self.height = height
-                def read(self) -> Tuple[np.ndarray, int]:
+                def read(self, out: Optional[np.ndarray] = None) -> Tuple[np.ndarray, int]:
                     frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
                     ts = time.time_ns()
                     return frame, ts
@@ -118,6 +115,11 @@ class VisionPipeline:
             self.camera = _DummyCamera(camera_width, camera_height)
         self.frame_w = camera_width
         self.frame_h = camera_height
+        # Per-frame RGB and preview BGR buffers, reused across loop iterations
+        self._frame_rgb_buf: Optional[np.ndarray] = None
+        self._preview_bgr_buf: Optional[np.ndarray] = None
+        self._preview_interval_ns = int(PREVIEW_INTERVAL_S * 1e9)
+        self._last_preview_ns = 0
         
         # Load configuration
         features_raw = _load_json(FEATURES_PATH)
@@ -151,6 +153,9 @@ class VisionPipeline:
         self._cloud_last_latency_ms = 0.0
         self._cloud_last_confidence = 0.0
         self._cloud_last_ok = False
+        # Validated/clamped (name, x, y) for the last cloud landmarks dict merged; a result is reused for many frames
+        self._cloud_points_src: Optional[Dict[str, Any]] = None
+        self._cloud_points: List[Tuple[str, float, float]] = []
         if self._cloud_client.enabled:
             self._cloud_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="CloudVision")
         self.refresh_cloud_limits()
@@ -607,8 +612,9 @@ class VisionPipeline:
         
         while self._running and not self._stop_event.is_set():
             try:
-                # Grab latest frame
-                frame_rgb, capture_ts_ns = self.camera.read()
+                # Grab latest frame into the buffer reused from the previous iteration
+                frame_rgb, capture_ts_ns = self.camera.read(out=self._frame_rgb_buf)
+                self._frame_rgb_buf = frame_rgb
                 capture_ts = capture_ts_ns / 1e9  # Convert to seconds
             except RuntimeError:
                 # Camera not ready yet
@@ -670,7 +676,11 @@ class VisionPipeline:
             if self.settings.aruco:
                 try:
                     from backend.ar_overlay import detect_aruco_anchors
-                    ar_anchors = detect_aruco_anchors(frame_rgb)
+                    # The pipeline frame is RGB; the detector converts straight to gray
+                    ar_anchors, self._aruco_last_meta = detect_aruco_anchors(frame_rgb, is_rgb=True)
+                    if ar_anchors:
+                        self._last_ar_anchors = ar_anchors
+                        self._aruco_last_detection_s = time.time()
                 except (RuntimeError, ImportError) as exc:
                     LOGGER.debug("ArUco detection unavailable: %s", exc)
             aruco_end_perf = time.perf_counter()
@@ -742,15 +752,9 @@ class VisionPipeline:
             except Exception as exc:  # pragma: no cover - debug aid
                 LOGGER.debug("Debug overlay drawing failed: %s", exc)
 
-            if self.set_preview_frame and frame_count % 2 == 0:
+            if self.set_preview_frame:
                 try:
-                    prev_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
-                    _, buffer = cv2.imencode(
-                        ".jpg",
-                        prev_bgr,
-                        [cv2.IMWRITE_JPEG_QUALITY, 85],
-                    )
-                    self.set_preview_frame(bytes(buffer))
+                    self._publish_preview(frame_rgb)
                 except Exception as exc:  # pragma: no cover - preview is best-effort
                     LOGGER.debug("Preview publish failed: %s", exc)
 
@@ -1024,6 +1028,21 @@ class VisionPipeline:
         self._ema[name] = smoothed
         return smoothed
 
+    def _publish_preview(self, frame_rgb: np.ndarray) -> bool:
+        """Encode the annotated frame for /preview.jpg, at most every PREVIEW_INTERVAL_S."""
+        now_ns = time.monotonic_ns()
+        if now_ns - self._last_preview_ns < self._preview_interval_ns:
+            return False
+        self._last_preview_ns = now_ns
+        prev_bgr = self._preview_bgr_buf = cv2.cvtColor(
+            frame_rgb, cv2.COLOR_RGB2BGR, dst=self._preview_bgr_buf
+        )
+        jpeg = encode_preview_jpeg(prev_bgr)
+        if jpeg is None:
+            return False
+        self.set_preview_frame(jpeg)
+        return True
+
     def _draw_debug_overlays(
         self,
         frame: np.ndarray,
@@ -1379,22 +1398,24 @@ class VisionPipeline:
     ) -> Dict[str, Tuple[float, float]]:
         if not isinstance(cloud_landmarks, dict):
             return base
+        if cloud_landmarks is not self._cloud_points_src:
+            points = []
+            for name, coords in cloud_landmarks.items():
+                if not isinstance(coords, (list, tuple)) or len(coords) != 2:
+                    continue
+                cx = min(1.0, max(0.0, float(coords[0])))
+                cy = min(1.0, max(0.0, float(coords[1])))
+                points.append((name, cx, cy))
+            self._cloud_points_src = cloud_landmarks
+            self._cloud_points = points
         blended = dict(base)
         weight = confidence if confidence > 0 else 0.5
         weight = max(0.2, min(0.8, weight))
-        for name, coords in cloud_landmarks.items():
-            if not isinstance(coords, (list, tuple)) or len(coords) != 2:
-                continue
-            cx = float(coords[0])
-            cy = float(coords[1])
-            cx = min(1.0, max(0.0, cx))
-            cy = min(1.0, max(0.0, cy))
-            if name in blended:
-                lx, ly = blended[name]
-                target = (
-                    lx * (1.0 - weight) + cx * weight,
-                    ly * (1.0 - weight) + cy * weight,
-                )
+        keep = 1.0 - weight
+        for name, cx, cy in self._cloud_points:
+            prev = blended.get(name)
+            if prev is not None:
+                target = (prev[0] * keep + cx * weight, prev[1] * keep + cy * weight)
             else:
                 target = (cx, cy)
             blended[name] = self._smooth(name, target)
@@ -1407,8 +1428,8 @@ class VisionPipeline:
         if bbox is None:
             frame_h, frame_w = frame_rgb.shape[:2]
             bbox = (0, 0, frame_w, frame_h)
-        frame_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
-        roi_bytes = CloudVisionClient.roi_bytes(frame_bgr, bbox)
+        # Crop before any colour conversion; the ROI is a small slice of the frame
+        roi_bytes = CloudVisionClient.roi_bytes(frame_rgb, bbox, is_rgb=True)
         if not roi_bytes:
             return
         self._cloud_future = self._cloud_executor.submit(self._cloud_client.detect_faces, roi_bytes)
@@ -44,6 +44,7 @@ class VoiceAssistant:
         stt_client: Optional[Any] = None,
         tts_client: Optional[Any] = None,
         llm_client: Optional[Any] = None,
+        tts_encoding: str = "LINEAR16",
     ) -> None:
         self.max_retries = max_retries
         stt_kwargs = dict(stt_kwargs or {})
@@ -80,7 +81,8 @@ class VoiceAssistant:
             self.listener = STT(**speech_params)
 
         self.middleman = llm_client or GeminiAssistant(project_id, location)
-        self.speaker = tts_client or TTS()
+        # LINEAR16 by default: converse() plays replies live, and WAV needs no ffmpeg decode
+        self.speaker = tts_client or TTS(audio_encoding=tts_encoding)
 
         components = (self.listener, self.middleman, self.speaker)
         self.enabled = all(getattr(component, "enabled", True) for component in components)
@@ -233,6 +235,8 @@ def build_voice_assistant_from_env(
         max_retries=int(os.getenv("VOICE_MAX_RETRIES", "3")),
         use_vertex_stt=use_vertex,
         stt_kwargs={**stt_kwargs, "language_code": language},
+        # The app returns the audio over HTTP rather than playing it, so default to compact MP3
+        tts_encoding=os.getenv("VOICE_TTS_ENCODING", "MP3").upper(),
     )
 
     if not assistant.enabled:
@@ -82,7 +82,11 @@ module.exports = NodeHelper.create({
 				console.error("MMM-AssistiveCoach: Invalid JSON", error);
 				return;
 			}
-			this.sendSocketNotification("MMM_ASSISTIVECOACH_EVENT", payload);
+			// Backend coalesces queued messages into {"type": "batch", "msgs": [...]}
+			const events = payload.type === "batch" ? payload.msgs || [] : [payload];
+			for (const event of events) {
+				this.sendSocketNotification("MMM_ASSISTIVECOACH_EVENT", event);
+			}
 		});
 
 		this.client.on("error", (error) => {
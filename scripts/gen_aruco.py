@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 """
 Generate printable ArUco markers for IDs used by the tool guidance.
+The default dictionary matches the backend detector (ar_overlay.DEFAULT_DICT).
 Usage:
-  python scripts/gen_aruco.py --ids 23 42 --size 500 --dict DICT_5X5_250 --out out_dir
+  python scripts/gen_aruco.py --ids 23 42 --size 500 --dict DICT_5X5_50 --out out_dir
 """
 import argparse
 import importlib
@@ -16,19 +17,15 @@ def main() -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument('--ids', type=int, nargs='+', default=[23, 42])
     ap.add_argument('--size', type=int, default=500)
-    ap.add_argument('--dict', dest='dict_name', type=str, default='DICT_5X5_250')
+    ap.add_argument('--dict', dest='dict_name', type=str, default='DICT_5X5_50')
     ap.add_argument('--out', type=str, default='markers')
     args = ap.parse_args()
 
     aruco = importlib.import_module('cv2.aruco')
-<<<<<<< HEAD
-    dictionary = getattr(aruco, args.dict_name, getattr(aruco, 'DICT_5X5_250'))
-    dictionary = aruco.getPredefinedDictionary(dictionary)
-=======
     # Resolve dictionary constant and instance across API variants
     dict_const = getattr(aruco, args.dict_name, None)
     if dict_const is None:
-        dict_const = getattr(aruco, 'DICT_5X5_250')
+        dict_const = getattr(aruco, 'DICT_5X5_50')
     dictionary = None
     if hasattr(aruco, 'getPredefinedDictionary'):
         dictionary = aruco.getPredefinedDictionary(dict_const)
@@ -36,16 +33,11 @@ def main() -> int:
         dictionary = aruco.Dictionary_get(dict_const)
     else:
         raise RuntimeError('cv2.aruco dictionary API not found')
->>>>>>> 3fd54b7223d6d85794d599f6829e5349642b0e6f
 
     out_dir = Path(args.out)
     out_dir.mkdir(parents=True, exist_ok=True)
 
     for mid in args.ids:
-<<<<<<< HEAD
-        img = np.zeros((args.size, args.size), dtype=np.uint8)
-        img = aruco.drawMarker(dictionary, int(mid), args.size)
-=======
         # Generate marker image with compatibility across OpenCV builds
         img = None
         if hasattr(aruco, 'drawMarker'):
@@ -69,7 +61,6 @@ def main() -> int:
                 img = canvas
             else:
                 raise RuntimeError('cv2.aruco draw API not available')
->>>>>>> 3fd54b7223d6d85794d599f6829e5349642b0e6f
         out_path = out_dir / f'aruco_{mid}.png'
         cv2.imwrite(str(out_path), img)
         print(f'Wrote {out_path}')
@@ -24,26 +24,32 @@ async def test_overlays():
                     message = await asyncio.wait_for(websocket.recv(), timeout=5.0)
                     data = json.loads(message)
                     
-                    if data.get("type") == "overlay.set":
-                        message_count += 1
-                        shapes = data.get("shapes", [])
-                        hud = data.get("hud", {})
+                    # Backend coalesces queued messages into {"type": "batch", "msgs": [...]}
+                    events = data.get("msgs", []) if data.get("type") == "batch" else [data]
+                    
+                    for data in events:
+                        if message_count >= 20:
+                            break
+                        if data.get("type") == "overlay.set":
+                            message_count += 1
+                            shapes = data.get("shapes", [])
+                            hud = data.get("hud", {})
                         
-                        print(f"\n📊 Overlay #{message_count}")
-                        print(f"   HUD Title: {hud.get('title', 'N/A')}")
-                        print(f"   Shapes: {len(shapes)}")
+                            print(f"\n📊 Overlay #{message_count}")
+                            print(f"   HUD Title: {hud.get('title', 'N/A')}")
+                            print(f"   Shapes: {len(shapes)}")
                         
-                        for i, shape in enumerate(shapes):
-                            kind = shape.get("kind", "unknown")
-                            anchor = shape.get("anchor", {}).get("pixel", {})
-                            text = shape.get("text", "")
+                            for i, shape in enumerate(shapes):
+                                kind = shape.get("kind", "unknown")
+                                anchor = shape.get("anchor", {}).get("pixel", {})
+                                text = shape.get("text", "")
                             
-                            print(f"     Shape {i+1}: {kind} at ({anchor.get('x', 0)}, {anchor.get('y', 0)})", end="")
-                            if text:
-                                print(f" - '{text}'", end="")
-                            if kind == "ring":
-                                print(f" (radius: {shape.get('radius_px', 0)}px)", end="")
-                            print()
+                                print(f"     Shape {i+1}: {kind} at ({anchor.get('x', 0)}, {anchor.get('y', 0)})", end="")
+                                if text:
+                                    print(f" - '{text}'", end="")
+                                if kind == "ring":
+                                    print(f" (radius: {shape.get('radius_px', 0)}px)", end="")
+                                print()
                             
                 except asyncio.TimeoutError:
                     print("⏱️  No messages for 5s, still listening...")